@@ -1,12 +1,15 @@
 # Copyright 2020 Tecnativa - Manuel Calero
 # Copyright 2014-2022 Tecnativa - Pedro M. Baeza
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+import logging
 from collections import defaultdict
 
 from lxml import etree
 
 from odoo import _, api, exceptions, fields, models, Command
 
+_logger = logging.getLogger(__name__)
+
 
 class AccountMove(models.Model):
     _inherit = "account.move"
@@ -129,7 +132,7 @@ class AccountMove(models.Model):
 
         # Now apply our commission logic
         for move in self:
-            print('Invoice posted')
+            _logger.debug('Invoice posted')
             agents = move.invoice_line_ids.mapped('agents')
             if agents:
                 move.agents_name_invoice = [(6, 0, agents.ids)]
@@ -139,15 +142,15 @@ class AccountMove(models.Model):
 
                 # Loop through all agents for the partner
                 for agent in partner.agent_ids:
-                    print(f"\nAgent: {agent.name}")
-                    print(f"Salary: {agent.salary}")
+                    _logger.debug("Agent: %s", agent.name)
+                    _logger.debug("Salary: %s", agent.salary)
 
                     # Get all customers with this agent
                     customers = self.env['res.partner'].search([
                         ('agent_ids', 'in', agent.id)
                     ])
 
-                    print(move.agents_name_invoice)
+                    _logger.debug('%s', move.agents_name_invoice)
 
                     # Make sure the current partner is included in customers
                     if partner.id not in customers.ids:
@@ -160,7 +163,7 @@ class AccountMove(models.Model):
                         ('state', 'in', ['posted']),
                         ('invoice_date', '!=', False),
                     ])
-                    print(invoices)
+                    _logger.debug('%s', invoices)
 
                     # Group totals by month name
                     monthly_totals = defaultdict(float)
@@ -181,19 +184,19 @@ class AccountMove(models.Model):
                     current_invoice_total = move.amount_untaxed
                     monthly_invoice_total = monthly_totals.get(current_month_name, 0.0)
                     salary_threshold = move.agents_name_invoice.salary * 2
-                    print('salary_threshold', salary_threshold)
+                    _logger.debug('salary_threshold %s', salary_threshold)
 
                     # Display monthly totals for debugging
                     for month in ordered_months:
                         total = monthly_totals.get(month, 0.0)
-                        print(f"Agent: {agent.name}, Month: {month}, Total: {total:.2f}")
+                        _logger.debug("Agent: %s, Month: %s, Total: %.2f", agent.name, month, total)
                         if month == current_month_name:
-                            print(f"?? Current Invoice Total This Month: {monthly_invoice_total:.2f}")
+                            _logger.debug("?? Current Invoice Total This Month: %.2f", monthly_invoice_total)
 
-                    print(f"Current invoice amount: {current_invoice_total:.2f}")
-                    print(f"Monthly total: {monthly_invoice_total:.2f}")
-                    print(f"Salary threshold (salary * 2): {salary_threshold:.2f}")
-                    print('all invoice', current_invoice_total + monthly_invoice_total)
+                    _logger.debug("Current invoice amount: %.2f", current_invoice_total)
+                    _logger.debug("Monthly total: %.2f", monthly_invoice_total)
+                    _logger.debug("Salary threshold (salary * 2): %.2f", salary_threshold)
+                    _logger.debug('all invoice %s', current_invoice_total + monthly_invoice_total)
 
                     # Commission calculation logic
                     commission_calculated = False
@@ -202,35 +205,35 @@ class AccountMove(models.Model):
                     if monthly_invoice_total == salary_threshold:
                         move.commission_total = salary_threshold * 0.05
                         commission_calculated = True
-                        print(f"? Commission triggered by monthly total: {move.commission_total:.2f}")
-                        print(f"   Monthly total ({monthly_invoice_total:.2f}) >= Threshold ({salary_threshold:.2f})")
+                        _logger.debug("? Commission triggered by monthly total: %.2f", move.commission_total)
+                        _logger.debug("   Monthly total (%.2f) >= Threshold (%.2f)", monthly_invoice_total, salary_threshold)
 
                     if monthly_invoice_total > salary_threshold:
                         move.commission_total = (monthly_invoice_total)* 0.05
                         commission_calculated = True
-                        print(f"? Commission triggered by monthly total: {move.commission_total:.2f}")
-                        print(f"   Monthly total ({monthly_invoice_total:.2f}) >= Threshold ({salary_threshold:.2f})")
+                        _logger.debug("? Commission triggered by monthly total: %.2f", move.commission_total)
+                        _logger.debug("   Monthly total (%.2f) >= Threshold (%.2f)", monthly_invoice_total, salary_threshold)
 
                     # Check if current invoice alone >= salary * 2
                     if current_invoice_total == salary_threshold and monthly_invoice_total < salary_threshold :
                         move.commission_total = salary_threshold * 0.05
                         commission_calculated = True
-                        print(f"? Commission triggered by single invoice: {move.commission_total:.2f}")
-                        print(f"   Invoice amount ({current_invoice_total:.2f}) >= Threshold ({salary_threshold:.2f})")
+                        _logger.debug("? Commission triggered by single invoice: %.2f", move.commission_total)
+                        _logger.debug("   Invoice amount (%.2f) >= Threshold (%.2f)", current_invoice_total, salary_threshold)
 
 
                     if current_invoice_total > salary_threshold:
                         move.commission_total = (current_invoice_total) * 0.05
                         commission_calculated = True
-                        print(f"? Commission triggered by single invoice: {move.commission_total:.2f}")
-                        print(f"   Invoice amount ({current_invoice_total:.2f}) >= Threshold ({salary_threshold:.2f})")
+                        _logger.debug("? Commission triggered by single invoice: %.2f", move.commission_total)
+                        _logger.debug("   Invoice amount (%.2f) >= Threshold (%.2f)", current_invoice_total, salary_threshold)
 
                     if not commission_calculated:
                         move.commission_total = 0.0
-                        print(f"?? No commission triggered.")
-                        print(
-                            f"   Monthly total: {monthly_invoice_total:.2f}, Invoice amount: {current_invoice_total:.2f}")
-                        print(f"   Both are less than threshold: {salary_threshold:.2f}")
+                        _logger.debug("?? No commission triggered.")
+                        _logger.debug(
+                            "   Monthly total: %.2f, Invoice amount: %.2f", monthly_invoice_total, current_invoice_total)
+                        _logger.debug("   Both are less than threshold: %.2f", salary_threshold)
 
         return res
 
@@ -370,11 +373,11 @@ class AccountInvoiceLineAgent(models.Model):
     def _compute_amount(self):
         for line in self:
             inv_line = line.object_id
-            print('hello', line.object_id.partner_id.new_customer)
+            _logger.debug('new_customer %s', line.object_id.partner_id.new_customer)
             if inv_line.partner_id.new_customer:
                 commission_id = line.agent_id.new_customer_commission
                 count = line.agent_id.new_customer_count
-                print("subtotallllll",inv_line.price_subtotal)
+                _logger.debug('price_subtotal %s', inv_line.price_subtotal)
                 line.amount = line._get_new_customer_commission_amount(
                     commission_id,
                     inv_line.price_subtotal,
@@ -1,7 +1,6 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
 from datetime import datetime
-import base64
 import calendar
 
 class DoctorInvoiceWizard(models.TransientModel):
@@ -19,7 +18,6 @@ class DoctorInvoiceWizard(models.TransientModel):
         required=True,
         default=lambda self: datetime.today().year
     )
-    make_report = fields.Binary(string="تقرير PDF", readonly=True)
     report_name = fields.Char(string="اسم الملف")
 
     def action_generate_report_invoice(self):
@@ -69,19 +67,8 @@ class DoctorInvoiceWizard(models.TransientModel):
             'agents_data': agents_data,
         }
 
-        # إنشاء التقرير PDF
-        report_template = 'appointments.doctor_report_invoices_template'
-        pdf_content, _ = self.env['ir.actions.report']._render_qweb_pdf(
-            report_template,
-            res_ids=self.ids,
-            data={'data': data}
-        )
-
-        self.make_report = base64.b64encode(pdf_content)
+        # إنشاء التقرير PDF في الخلفية
         self.report_name = f"تقرير-{calendar.month_name[month]}-{year}.pdf"
-
-        return {
-            'type': 'ir.actions.act_url',
-            'url': f"/web/content?model=doctor.invoice.wizard&id={self.id}&field=make_report&filename_field=report_name&download=true",
-            'target': 'new',
-        }
+        return self.env['report.render.job'].enqueue(
+            'appointments.doctor_report_invoices_template', {'data': data}, self.report_name,
+        )
@@ -1,7 +1,7 @@
 {
     "name": "Doctor's Appointment",
     "author": 'Shins',
-    'version': '0.1',
+    'version': '0.2',
     'license': 'LGPL-3',
     "depends": ['base','hr','stock','report_xlsx', 'physiotherapy'],
     'data': [
@@ -0,0 +1,41 @@
+import hashlib
+
+from werkzeug.exceptions import BadRequest
+from werkzeug.http import http_date
+
+from odoo import fields, http
+from odoo.http import request, route
+
+
+class AppointmentSlots(http.Controller):
+
+    @route('/doctors_appointment/free_slots', methods=['POST'], type='json', auth='user')
+    def free_slots(self, date_from, date_to, doctor_ids=None, **kwargs):
+        return request.env['patient.appointment'].find_free_slots(date_from, date_to, doctor_ids=doctor_ids)
+
+
+class AppointmentCalendar(http.Controller):
+
+    @route('/doctors_appointment/week_calendar', methods=['GET'], type='http', auth='user')
+    def week_calendar(self, week_start, doctor_ids='', **kwargs):
+        Appointment = request.env['patient.appointment']
+        try:
+            week_start = fields.Date.to_date(week_start)
+            doctor_ids = [int(doctor_id) for doctor_id in doctor_ids.split(',') if doctor_id]
+        except ValueError:
+            raise BadRequest("Invalid week_start or doctor_ids")
+        if not week_start:
+            raise BadRequest("Invalid week_start or doctor_ids")
+        last_write, count = Appointment.get_week_calendar_version(week_start, doctor_ids)
+
+        # الـ ETag بيتغير مع أي تعديل أو حذف أو مستخدم مختلف، فشاشات الاستقبال بتاخد 304 لو مفيش جديد
+        # (وكمان مع تعديل المرضى أو الدكاترة، لأن أساميهم ظاهرة في الجدول)
+        version = f"{request.env.uid}:{request.env.user.tz}:{week_start}:{doctor_ids}:{last_write}:{count}"
+        etag = hashlib.sha1(version.encode()).hexdigest()
+        headers = [('ETag', f'"{etag}"'), ('Cache-Control', 'private, no-cache')]
+        if last_write:
+            headers.append(('Last-Modified', http_date(last_write)))
+        if etag in request.httprequest.if_none_match:
+            return request.make_response('', headers=headers, status=304)
+
+        return request.make_json_response(Appointment.get_week_calendar(week_start, doctor_ids), headers=headers)
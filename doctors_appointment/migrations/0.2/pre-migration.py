@@ -0,0 +1,11 @@
+def migrate(cr, version):
+    if not version:
+        return
+
+    # نملا نهاية المواعيد قبل ما قيد منع التداخل يتضاف، بدل ما الـ ORM يحسبها بعده
+    cr.execute("ALTER TABLE patient_appointment ADD COLUMN IF NOT EXISTS appointment_end timestamp")
+    cr.execute("""
+        UPDATE patient_appointment
+           SET appointment_end = appointment_date + interval '30 minutes'
+         WHERE appointment_date IS NOT NULL
+    """)
@@ -21,11 +21,13 @@
 #     notes = fields.Text(string="ملاحظات")
 #     is_reserved = fields.Boolean(string="محجوز؟", default=False)
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from odoo.exceptions import ValidationError
 
 from odoo import models, fields, api
 
+from .patient_appointment import APPOINTMENT_PERIODS, appointment_period_bounds, appointment_period_domain
+
 
 class DoctorAppointment(models.Model):
     _name = 'doctor.appointment'
@@ -38,26 +40,36 @@ class DoctorAppointment(models.Model):
         string="موعد المريض",
         domain="[('patient_id', '=', patient_id)]"
     )
-    appointment_date = fields.Datetime(string="تاريخ ووقت الموعد")
+    appointment_date = fields.Datetime(string="تاريخ ووقت الموعد", index=True)
 
     doctors_id = fields.Many2one('hr.employee', string="الأخصائي", related='patient_id.doctor', store=True)
     notes = fields.Text(string="ملاحظات")
     is_reserved = fields.Boolean(string="محجوز؟", default=False)
 
-    is_this_week = fields.Boolean(string="هذا الأسبوع", compute='_compute_is_this_week', store=False)
+    is_this_week = fields.Boolean(string="هذا الأسبوع", compute='_compute_is_this_week', store=False,
+                                  search='_search_is_this_week')
+    is_today = fields.Boolean(string="اليوم", compute='_compute_is_this_week', store=False,
+                              search='_search_is_today')
+    is_next_week = fields.Boolean(string="الأسبوع القادم", compute='_compute_is_this_week', store=False,
+                                  search='_search_is_next_week')
 
     @api.depends('appointment_date')
     def _compute_is_this_week(self):
-        today = fields.Date.context_today(self)
-        start_of_week = today - timedelta(days=today.weekday())  # يوم الاثنين
-        end_of_week = start_of_week + timedelta(days=6)  # الأحد
-
+        bounds = {period: appointment_period_bounds(self, period) for period in APPOINTMENT_PERIODS}
         for rec in self:
-            if rec.appointment_date:
-                date_only = rec.appointment_date.date()
-                rec.is_this_week = start_of_week <= date_only <= end_of_week
-            else:
-                rec.is_this_week = False
+            date = rec.appointment_date
+            rec.is_today = bool(date) and bounds['today'][0] <= date < bounds['today'][1]
+            rec.is_this_week = bool(date) and bounds['this_week'][0] <= date < bounds['this_week'][1]
+            rec.is_next_week = bool(date) and bounds['next_week'][0] <= date < bounds['next_week'][1]
+
+    def _search_is_this_week(self, operator, value):
+        return appointment_period_domain(self, 'this_week', operator, value)
+
+    def _search_is_today(self, operator, value):
+        return appointment_period_domain(self, 'today', operator, value)
+
+    def _search_is_next_week(self, operator, value):
+        return appointment_period_domain(self, 'next_week', operator, value)
 
 
 
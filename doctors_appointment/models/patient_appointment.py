@@ -1,17 +1,61 @@
 from odoo import api, models, fields
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from odoo.osv import expression
-from odoo.exceptions import ValidationError
+from odoo.exceptions import UserError, ValidationError
 from odoo.tools import DEFAULT_SERVER_DATETIME_FORMAT
 from pytz import timezone, UTC
 
+# مدة الموعد؛ مفيش موعدين لنفس الدكتور يتداخلوا في المدة دي
+APPOINTMENT_DURATION = timedelta(minutes=30)
+# مواعيد العيادة (بتوقيت المستخدم) اللي بندور فيها على المواعيد الفاضية
+CLINIC_OPENING_HOUR = 9
+CLINIC_CLOSING_HOUR = 21
+# أقصى عدد أيام في طلب واحد للبحث عن المواعيد الفاضية
+FREE_SLOTS_MAX_DAYS = 31
+# (أول يوم بالنسبة للنهارده، عدد الأيام) لكل فترة من فلاتر المواعيد
+APPOINTMENT_PERIODS = {
+    'today': (lambda today: today, 1),
+    'this_week': (lambda today: today - timedelta(days=today.weekday()), 7),  # من الاثنين للأحد
+    'next_week': (lambda today: today - timedelta(days=today.weekday()) + timedelta(days=7), 7),
+}
+
+
+def appointment_period_bounds(record, period):
+    """Return the naive UTC ``[start, end)`` datetimes of ``period`` in the user's timezone."""
+    first_day, days = APPOINTMENT_PERIODS[period]
+    start_date = first_day(fields.Date.context_today(record))
+    tz = timezone(record.env.context.get('tz') or record.env.user.tz or 'UTC')
+    start, end = (
+        tz.localize(datetime.combine(day, time.min)).astimezone(UTC).replace(tzinfo=None)
+        for day in (start_date, start_date + timedelta(days=days))
+    )
+    return start, end
+
+
+def appointment_period_domain(record, period, operator, value):
+    """Translate a search on a period flag into an ``appointment_date`` range."""
+    if operator not in ('=', '!='):
+        raise ValidationError(f"Unsupported operator {operator} for {period}")
+    start, end = appointment_period_bounds(record, period)
+    if (operator == '=') == bool(value):
+        return [('appointment_date', '>=', start), ('appointment_date', '<', end)]
+    return ['|', '|', ('appointment_date', '=', False), ('appointment_date', '<', start), ('appointment_date', '>=', end)]
+
+
 class PatientAppointment(models.Model):
     _name = "patient.appointment"
     _description = "Patient Records"
+    _sql_constraints = [
+        ('doctor_appointment_no_overlap',
+         "EXCLUDE USING gist (doctors_id WITH =, tsrange(appointment_date, appointment_end) WITH &&) "
+         "WHERE (doctors_id IS NOT NULL AND appointment_date IS NOT NULL AND appointment_end IS NOT NULL)",
+         "⚠ لا يمكن حجز ميعاد لنفس الدكتور خلال 30 دقيقة من ميعاد آخر."),
+    ]
 
     patient_id = fields.Many2one('res.partner', string="المريض")
     doctors_id = fields.Many2one('hr.employee', string="الأخصائي")
-    appointment_date = fields.Datetime(string="تاريخ ووقت الموعد")
+    appointment_date = fields.Datetime(string="تاريخ ووقت الموعد", index=True)
+    appointment_end = fields.Datetime(string="نهاية الموعد", compute='_compute_appointment_end', store=True)
     appointment_type = fields.Selection([
         ('checkup', 'فحص'),
         ('treatment', 'علاج'),
@@ -26,7 +70,17 @@ class PatientAppointment(models.Model):
     done = fields.Boolean(string="تم", default=False)
     notes = fields.Text(string="ملاحظات")
     is_reserved = fields.Boolean(string="محجوز؟", default=False)
-    is_this_week = fields.Boolean(string="هذا الأسبوع", compute='_compute_is_this_week', store=False)
+    is_this_week = fields.Boolean(string="هذا الأسبوع", compute='_compute_is_this_week', store=False,
+                                  search='_search_is_this_week')
+    is_today = fields.Boolean(string="اليوم", compute='_compute_is_this_week', store=False,
+                              search='_search_is_today')
+    is_next_week = fields.Boolean(string="الأسبوع القادم", compute='_compute_is_this_week', store=False,
+                                  search='_search_is_next_week')
+
+    def _auto_init(self):
+        # قيد منع التداخل محتاج btree_gist عشان يقارن doctors_id جوه فهرس gist
+        self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        return super(PatientAppointment, self)._auto_init()
 
     @api.onchange('patient_id')
     def _onchange_patient_id(self):
@@ -37,15 +91,26 @@ class PatientAppointment(models.Model):
 
     @api.depends('appointment_date')
     def _compute_is_this_week(self):
-        today = fields.Date.context_today(self)
-        start_of_week = today - timedelta(days=today.weekday())  # يوم الاثنين
-        end_of_week = start_of_week + timedelta(days=6)  # الأحد
+        bounds = {period: appointment_period_bounds(self, period) for period in APPOINTMENT_PERIODS}
+        for rec in self:
+            date = rec.appointment_date
+            rec.is_today = bool(date) and bounds['today'][0] <= date < bounds['today'][1]
+            rec.is_this_week = bool(date) and bounds['this_week'][0] <= date < bounds['this_week'][1]
+            rec.is_next_week = bool(date) and bounds['next_week'][0] <= date < bounds['next_week'][1]
+
+    def _search_is_this_week(self, operator, value):
+        return appointment_period_domain(self, 'this_week', operator, value)
+
+    def _search_is_today(self, operator, value):
+        return appointment_period_domain(self, 'today', operator, value)
+
+    def _search_is_next_week(self, operator, value):
+        return appointment_period_domain(self, 'next_week', operator, value)
+
+    @api.depends('appointment_date')
+    def _compute_appointment_end(self):
         for rec in self:
-            if rec.appointment_date:
-                date_only = rec.appointment_date.date()
-                rec.is_this_week = start_of_week <= date_only <= end_of_week
-            else:
-                rec.is_this_week = False
+            rec.appointment_end = rec.appointment_date and rec.appointment_date + APPOINTMENT_DURATION
 
     @api.depends('pharmacy_line_ids.total')
     def _compute_total_amount(self):
@@ -64,47 +129,274 @@ class PatientAppointment(models.Model):
 
     @api.model
     def search_fetch(self, domain, field_names, offset=0, limit=None, order=None):
-        user = self.env.user
-        if user.has_group('doctors_appointment.group_doctors_appointment_doctor'):
-            domain = expression.AND([
-                domain,
-                [('doctors_id.user_id', '=', user.id)]])
+        domain = expression.AND([domain, self._get_doctor_scope_domain()])
         return super(PatientAppointment, self).search_fetch(
             domain, field_names, offset=offset, limit=limit, order=order)
 
+    @api.model
+    def _get_doctor_scope_domain(self):
+        user = self.env.user
+        if user.has_group('doctors_appointment.group_doctors_appointment_doctor'):
+            return [('doctors_id.user_id', '=', user.id)]
+        return []
+
+    @api.model
+    def _get_week_calendar_domain(self, week_start, doctor_ids=None):
+        """Return the domain of the week starting on the Monday of ``week_start`` in the user's timezone."""
+        monday = fields.Date.to_date(week_start)
+        monday -= timedelta(days=monday.weekday())
+        tz = timezone(self.env.context.get('tz') or self.env.user.tz or 'UTC')
+        start, end = (
+            tz.localize(datetime.combine(day, time.min)).astimezone(UTC).replace(tzinfo=None)
+            for day in (monday, monday + timedelta(days=7))
+        )
+        domain = [('appointment_date', '>=', start), ('appointment_date', '<', end)]
+        if doctor_ids:
+            domain.append(('doctors_id', 'in', doctor_ids))
+        return monday, domain
+
+    @api.model
+    def get_week_calendar_version(self, week_start, doctor_ids=None):
+        """Return ``(last write_date, count)`` of the week, cheap enough to answer conditional requests.
+
+        The last write_date also covers the patients and doctors of the week,
+        since the grid shows their names.
+        """
+        domain = self._get_week_calendar_domain(week_start, doctor_ids)[1]
+        groups = self._read_group(
+            expression.AND([domain, self._get_doctor_scope_domain()]),
+            ['patient_id', 'doctors_id'], ['write_date:max', '__count'],
+        )
+        patients = self.env['res.partner'].concat(*(patient for patient, _doctor, _write, _count in groups))
+        doctors = self.env['hr.employee'].concat(*(doctor for _patient, doctor, _write, _count in groups))
+        write_dates = [last_write for _patient, _doctor, last_write, _count in groups]
+        # بـ sudo لأن المطلوب تاريخ التعديل بس، والاستقبال ممكن ميكونش ليه صلاحية يقرا hr.employee كامل
+        write_dates += patients.sudo().mapped('write_date') + doctors.sudo().mapped('write_date')
+        return max(filter(None, write_dates), default=False), sum(count for *_group, count in groups)
+
+    @api.model
+    def get_week_calendar(self, week_start, doctor_ids=None):
+        """Return a compact per-doctor grid of the appointments of the week of ``week_start``."""
+        monday, domain = self._get_week_calendar_domain(week_start, doctor_ids)
+        appointments = self.search_fetch(
+            domain, ['doctors_id', 'patient_id', 'appointment_date', 'appointment_type', 'done', 'is_reserved'],
+            order='doctors_id, appointment_date',
+        )
+        tz = timezone(self.env.context.get('tz') or self.env.user.tz or 'UTC')
+        doctors = {}
+        for appointment in appointments:
+            doctor = appointment.doctors_id
+            if doctor.id not in doctors:
+                doctors[doctor.id] = {'id': doctor.id, 'name': doctor.name or '', 'appointments': []}
+            doctors[doctor.id]['appointments'].append({
+                'id': appointment.id,
+                'patient': appointment.patient_id.name or '',
+                'start': UTC.localize(appointment.appointment_date).astimezone(tz).strftime('%Y-%m-%d %H:%M'),
+                'type': appointment.appointment_type,
+                'done': appointment.done,
+                'reserved': appointment.is_reserved,
+            })
+        return {
+            'week_start': fields.Date.to_string(monday),
+            'days': [fields.Date.to_string(monday + timedelta(days=offset)) for offset in range(7)],
+            'doctors': list(doctors.values()),
+        }
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._check_doctor_appointment_conflict([
+            (vals.get('doctors_id'), fields.Datetime.to_datetime(vals.get('appointment_date')))
+            for vals in vals_list
+        ])
+        return super(PatientAppointment, self).create(vals_list)
+
     def write(self, vals):
-        for rec in self:
-            if 'doctors_id' in vals and vals['doctors_id'] != rec.doctors_id.id:
-                new_vals = rec.copy_data()[0]
-                new_vals['doctors_id'] = vals['doctors_id']
-                self.env['patient.appointment'].create(new_vals)
+        if 'doctors_id' in vals:
+            changed = self.filtered(lambda rec: rec.doctors_id.id != vals['doctors_id'])
+            if changed:
+                # باقي القيم بتتكتب على كل السجلات الأول، عشان النسخ الجديدة تاخدها هي كمان
+                other_vals = {key: value for key, value in vals.items() if key != 'doctors_id'}
+                if other_vals:
+                    self.write(other_vals)
+                changed.reassign_doctor(vals['doctors_id'], keep_original=True)
                 return True
+        if 'appointment_date' in vals:
+            appointment_date = fields.Datetime.to_datetime(vals['appointment_date'])
+            self._check_doctor_appointment_conflict(
+                [(rec.doctors_id.id, appointment_date) for rec in self], exclude_ids=self.ids,
+            )
         return super(PatientAppointment, self).write(vals)
 
-    @api.constrains('doctors_id', 'appointment_date')
-    def _check_doctor_appointment_conflict(self):
-        user_tz = self.env.user.tz or 'UTC'
-        tz = timezone(user_tz)
+    @api.model
+    def _check_doctor_appointment_conflict(self, slots, exclude_ids=()):
+        """Raise a friendly error if a ``(doctor_id, appointment_date)`` slot overlaps another appointment.
+
+        It runs before the INSERT/UPDATE, because the EXCLUDE constraint would
+        fail first with its generic message; the constraint stays as the guard
+        against concurrent bookings. ``exclude_ids`` are the appointments being
+        rewritten.
+        """
+        slots = sorted((doctor_id, date) for doctor_id, date in slots if doctor_id and date)
+        if not slots:
+            return
+        # التعارض بين المواعيد اللي بتتحفظ مع بعض
+        conflict_dates = set()
+        for (doctor_id, date), (next_doctor_id, next_date) in zip(slots, slots[1:]):
+            if doctor_id == next_doctor_id and next_date - date < APPOINTMENT_DURATION:
+                conflict_dates.update((date, next_date))
+        # والتعارض مع باقي مواعيد نفس الدكتور في استعلام واحد
+        self.flush_model(['doctors_id', 'appointment_date', 'appointment_end'])
+        self.env.cr.execute("""
+            SELECT DISTINCT other.appointment_date
+              FROM unnest(%(doctor_ids)s::int[], %(dates)s::timestamp[]) AS slot(doctor_id, slot_start)
+              JOIN patient_appointment other
+                ON other.doctors_id = slot.doctor_id
+               AND other.id != ALL(%(exclude_ids)s::int[])
+               AND other.appointment_end IS NOT NULL
+               AND tsrange(other.appointment_date, other.appointment_end)
+                   && tsrange(slot.slot_start, slot.slot_start + %(duration)s)
+        """, {
+            'doctor_ids': [doctor_id for doctor_id, _date in slots],
+            'dates': [date for _doctor_id, date in slots],
+            'exclude_ids': list(exclude_ids),
+            'duration': APPOINTMENT_DURATION,
+        })
+        conflict_dates.update(row[0] for row in self.env.cr.fetchall())
+        if conflict_dates:
+            tz = timezone(self.env.user.tz or 'UTC')
+            conflict_info = "\n".join(
+                f"• عند {UTC.localize(appointment_date).astimezone(tz).strftime('%Y-%m-%d %H:%M')}"
+                for appointment_date in sorted(conflict_dates)
+            )
+            raise ValidationError(
+                f"⚠ لا يمكن حجز ميعاد لنفس الدكتور خلال 30 دقيقة من ميعاد آخر.\nالمواعيد المتعارضة:\n{conflict_info}"
+            )
+
+    def reassign_doctor(self, doctor_id, keep_original=False):
+        """Move all the appointments in self to another doctor at once.
+
+        Conflicts with the doctor's other appointments, and between the moved
+        appointments themselves, are checked in one query and reported
+        together. With ``keep_original`` the appointments are copied to the
+        new doctor instead of being moved. Return the reassigned appointments.
+        """
+        if not self:
+            return self
+        if doctor_id:
+            # من غير دكتور مفيش حاجة تتعارض
+            self._check_reassignment_conflicts(doctor_id)
+        if keep_original:
+            return self.create([dict(rec.copy_data()[0], doctors_id=doctor_id) for rec in self])
+        super(PatientAppointment, self).write({'doctors_id': doctor_id})
+        return self
+
+    def _check_reassignment_conflicts(self, doctor_id):
+        self.flush_model(['doctors_id', 'appointment_date', 'appointment_end'])
+        self.env.cr.execute("""
+            SELECT rec.appointment_date, other.appointment_date
+              FROM patient_appointment rec
+              JOIN patient_appointment other
+                ON other.doctors_id = %(doctor_id)s
+               AND other.id NOT IN %(ids)s
+               AND other.appointment_end IS NOT NULL
+               AND tsrange(other.appointment_date, other.appointment_end)
+                   && tsrange(rec.appointment_date, rec.appointment_end)
+             WHERE rec.id IN %(ids)s
+               AND rec.appointment_end IS NOT NULL
+            UNION
+            SELECT rec.appointment_date, other.appointment_date
+              FROM patient_appointment rec
+              JOIN patient_appointment other
+                ON other.id > rec.id
+               AND other.id IN %(ids)s
+               AND other.appointment_end IS NOT NULL
+               AND tsrange(other.appointment_date, other.appointment_end)
+                   && tsrange(rec.appointment_date, rec.appointment_end)
+             WHERE rec.id IN %(ids)s
+               AND rec.appointment_end IS NOT NULL
+          ORDER BY 1, 2
+        """, {'doctor_id': doctor_id, 'ids': tuple(self.ids)})
+        conflicts = self.env.cr.fetchall()
+        if conflicts:
+            tz = timezone(self.env.user.tz or 'UTC')
+            local = lambda value: UTC.localize(value).astimezone(tz).strftime('%Y-%m-%d %H:%M')
+            conflict_info = "\n".join(f"• {local(date)} مع {local(other_date)}" for date, other_date in conflicts)
+            raise ValidationError(
+                f"⚠ لا يمكن نقل المواعيد للأخصائي {self.env['hr.employee'].browse(doctor_id).name} "
+                f"بسبب تعارضها مع مواعيد أخرى.\nالمواعيد المتعارضة:\n{conflict_info}"
+            )
+
+    @api.model
+    def find_free_slots(self, date_from, date_to, doctor_ids=None,
+                        opening_hour=CLINIC_OPENING_HOUR, closing_hour=CLINIC_CLOSING_HOUR):
+        """Return the free appointment slots of the doctors between two dates (both included).
+
+        Without ``doctor_ids``, the doctors are the employees whose user is in
+        the doctor group.
+
+        Slots are generated in the user's timezone between ``opening_hour`` and
+        ``closing_hour`` and checked against the existing appointments in one
+        query. Each slot is ``{'doctor_id', 'doctor_name', 'start', 'start_utc'}``
+        where ``start`` is local and ``start_utc`` is the value to store in
+        ``appointment_date``. The range may not be longer than
+        ``FREE_SLOTS_MAX_DAYS`` days.
+        """
+        date_from, date_to = fields.Date.to_date(date_from), fields.Date.to_date(date_to)
+        if not date_from or not date_to:
+            raise UserError("لازم تحديد بداية ونهاية الفترة للبحث عن المواعيد الفاضية.")
+        if (date_to - date_from).days + 1 > FREE_SLOTS_MAX_DAYS:
+            raise UserError(f"لا يمكن البحث عن المواعيد الفاضية لأكثر من {FREE_SLOTS_MAX_DAYS} يوم في المرة الواحدة.")
+        if doctor_ids:
+            doctors = self.env['hr.employee'].browse(doctor_ids)
+        else:
+            # الموظفين اللي مستخدمهم في جروب الدكاترة بس، مش الاستقبال والإدارة
+            doctor_group = self.env.ref('doctors_appointment.group_doctors_appointment_doctor')
+            doctors = self.env['hr.employee'].search([('user_id.groups_id', 'in', doctor_group.ids)])
+        if not doctors:
+            return []
+        tz = self.env.user.tz or 'UTC'
+        self.flush_model(['doctors_id', 'appointment_date', 'appointment_end'])
+        self.env.cr.execute("""
+            WITH slots AS (
+                SELECT doctor_id, local_start,
+                       (local_start AT TIME ZONE %(tz)s) AT TIME ZONE 'UTC' AS slot_start
+                  FROM unnest(%(doctor_ids)s::int[]) AS doctor_id
+            CROSS JOIN generate_series(%(date_from)s::date + make_interval(hours => %(opening_hour)s),
+                                       %(date_to)s::date + make_interval(hours => %(closing_hour)s) - %(duration)s,
+                                       %(duration)s) AS local_start
+                 WHERE local_start::time >= make_time(%(opening_hour)s, 0, 0)
+                   AND local_start::time + %(duration)s <= make_time(%(closing_hour)s, 0, 0)
+            )
+            SELECT slot.doctor_id, slot.local_start, slot.slot_start
+              FROM slots slot
+             WHERE slot.slot_start >= (now() AT TIME ZONE 'UTC')
+               AND NOT EXISTS (
+                    SELECT 1
+                      FROM patient_appointment appointment
+                     WHERE appointment.doctors_id = slot.doctor_id
+                       AND appointment.appointment_end IS NOT NULL
+                       AND tsrange(appointment.appointment_date, appointment.appointment_end)
+                           && tsrange(slot.slot_start, slot.slot_start + %(duration)s)
+               )
+          ORDER BY slot.doctor_id, slot.slot_start
+        """, {
+            'tz': tz,
+            'doctor_ids': doctors.ids,
+            'date_from': date_from,
+            'date_to': date_to,
+            'opening_hour': opening_hour,
+            'closing_hour': closing_hour,
+            'duration': APPOINTMENT_DURATION,
+        })
+        names = {doctor.id: doctor.name for doctor in doctors}
+        return [{
+            'doctor_id': doctor_id,
+            'doctor_name': names[doctor_id],
+            'start': fields.Datetime.to_string(local_start),
+            'start_utc': fields.Datetime.to_string(slot_start),
+        } for doctor_id, local_start, slot_start in self.env.cr.fetchall()]
+
 
-        for rec in self:
-            if rec.doctors_id and rec.appointment_date:
-                start_range = rec.appointment_date - timedelta(minutes=29)
-                end_range = rec.appointment_date + timedelta(minutes=29)
-
-                conflict_appointments = self.search([
-                    ('id', '!=', rec.id),
-                    ('doctors_id', '=', rec.doctors_id.id),
-                    ('appointment_date', '>=', start_range),
-                    ('appointment_date', '<=', end_range)
-                ])
-                if conflict_appointments:
-                    conflict_info = "\n".join(
-                        f"• عند {UTC.localize(appt.appointment_date).astimezone(tz).strftime('%Y-%m-%d %H:%M')}"
-                        for appt in conflict_appointments
-                    )
-                    raise ValidationError(
-                        f"⚠ لا يمكن حجز ميعاد لنفس الدكتور خلال 30 دقيقة من ميعاد آخر.\nالمواعيد المتعارضة:\n{conflict_info}"
-                    )
 class PatientPharmacyLines(models.Model):
     _name = "patient.pharmacy.lines"
     _description = "Patient Pharmacy Lines"
@@ -1,41 +1,57 @@
+from collections import defaultdict
+
 from odoo import models, fields, api
 
 class PatientReportXlsx(models.AbstractModel):
     _name = 'report.doctors_appointment.report_patient_prescription_xls'
     _inherit = 'report.report_xlsx.abstract'
 
-    def generate_xlsx_report(self, workbook, data, patients):
-        for obj in patients:
-            bold = workbook.add_format({'bold': True})
-            date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
-
-            for appointment in patients:
-                sheet = workbook.add_worksheet(appointment.patient_id.name)
-
-                sheet.merge_range(0, 0, 0, 1, 'Patient Name:', bold)
-                sheet.write(0, 2, appointment.patient_id.name)
-
-                sheet.merge_range(1, 0, 1, 1, 'Appointment Date:', bold)
-                sheet.write_datetime(1, 2, appointment.appointment_date, date_format)
-
-                sheet.merge_range(2, 0, 2, 1, 'Doctor:', bold)
-                sheet.write(2, 2, appointment.doctors_id.name)
+    def get_workbook_options(self):
+        # الشيت بيتكتب صف ورا صف، فمش محتاجين نحتفظ بالملف كله في الذاكرة
+        return dict(super().get_workbook_options(), constant_memory=True)
 
-                sheet.merge_range(3, 0, 3, 1, 'Appointment Type:', bold)
-                sheet.write(3, 2, appointment.appointment_type)
-
-                sheet.merge_range(4, 0, 4, 1, 'Prescription:', bold)
-                sheet.write(4, 2, appointment.observation)
-
-                sheet.write(6, 0, 'Medicine', bold)
-                sheet.write(6, 1, 'Dosage', bold)    
-                row = 7
-
-                for prescription_line in appointment.patient_prescription_line_ids:
-                    sheet.write(row, 0, prescription_line.medicine_id.name)
-                    sheet.write(row, 1, prescription_line.dosage)
-                    row += 1
-
-                # Set column width 
-                sheet.set_column(1, 1, 20)
-                sheet.set_column(1, 1, 20)
\ No newline at end of file
+    def generate_xlsx_report(self, workbook, data, patients):
+        bold = workbook.add_format({'bold': True})
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+
+        appointments = patients.read([
+            'patient_id', 'appointment_date', 'doctors_id', 'appointment_type', 'observation',
+            'patient_prescription_line_ids',
+        ])
+        lines_by_appointment = defaultdict(list)
+        line_ids = [line_id for appointment in appointments for line_id in appointment['patient_prescription_line_ids']]
+        for line in self.env['patient.prescription.line'].browse(line_ids).read(['prescription_id', 'medicine_id', 'dosage']):
+            lines_by_appointment[line['prescription_id'][0]].append(line)
+
+        # شيت واحد فيه جزء لكل موعد؛ شيت لكل موعد كان بيفتح ملف مؤقت لكل واحد مع constant_memory
+        sheet = workbook.add_worksheet('Prescriptions')
+        sheet.set_column(1, 1, 20)
+        row = 0
+        for appointment in appointments:
+            patient_name = appointment['patient_id'][1] if appointment['patient_id'] else ''
+
+            sheet.merge_range(row, 0, row, 1, 'Patient Name:', bold)
+            sheet.write(row, 2, patient_name)
+
+            sheet.merge_range(row + 1, 0, row + 1, 1, 'Appointment Date:', bold)
+            if appointment['appointment_date']:
+                sheet.write_datetime(row + 1, 2, appointment['appointment_date'], date_format)
+
+            sheet.merge_range(row + 2, 0, row + 2, 1, 'Doctor:', bold)
+            sheet.write(row + 2, 2, appointment['doctors_id'][1] if appointment['doctors_id'] else '')
+
+            sheet.merge_range(row + 3, 0, row + 3, 1, 'Appointment Type:', bold)
+            sheet.write(row + 3, 2, appointment['appointment_type'] or '')
+
+            sheet.merge_range(row + 4, 0, row + 4, 1, 'Prescription:', bold)
+            sheet.write(row + 4, 2, appointment['observation'] or '')
+
+            sheet.write(row + 6, 0, 'Medicine', bold)
+            sheet.write(row + 6, 1, 'Dosage', bold)
+            row += 7
+            for line in lines_by_appointment[appointment['id']]:
+                sheet.write(row, 0, line['medicine_id'][1] if line['medicine_id'] else '')
+                sheet.write(row, 1, line['dosage'] or '')
+                row += 1
+            # سطرين فاضيين بين كل موعد واللي بعده
+            row += 2
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged("post_install", "-at_install")
+class TestPatientAppointment(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.appointment_model = cls.env["patient.appointment"]
+        cls.doctor = cls.env["hr.employee"].create({"name": "Test Doctor"})
+        cls.patient = cls.env["res.partner"].create({"name": "Test Patient"})
+        cls.appointment = cls.appointment_model.create(
+            {
+                "patient_id": cls.patient.id,
+                "doctors_id": cls.doctor.id,
+                "appointment_date": datetime(2030, 1, 7, 10, 0),
+            }
+        )
+
+    def test_overlapping_appointment(self):
+        with self.assertRaisesRegex(ValidationError, "المواعيد المتعارضة"):
+            self.appointment_model.create(
+                {
+                    "patient_id": self.patient.id,
+                    "doctors_id": self.doctor.id,
+                    "appointment_date": datetime(2030, 1, 7, 10, 15),
+                }
+            )
+
+    def test_clear_doctor(self):
+        self.appointment.write({"doctors_id": False})
+        self.assertEqual(self.appointment.doctors_id, self.doctor)
+        copy = self.appointment_model.search(
+            [
+                ("patient_id", "=", self.patient.id),
+                ("doctors_id", "=", False),
+            ]
+        )
+        self.assertEqual(len(copy), 1)
+        self.assertEqual(copy.appointment_date, self.appointment.appointment_date)
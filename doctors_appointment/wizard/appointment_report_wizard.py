@@ -1,8 +1,15 @@
-from odoo import models, fields
+import logging
+
+from collections import defaultdict
+
+from odoo import api, models, fields
 from datetime import datetime, time
-import base64
 import calendar
 
+from odoo.addons.physiotherapy.tools import instrumented
+
+_logger = logging.getLogger(__name__)
+
 class AppointmentReportWizard(models.TransientModel):
     _name = 'appointment.report.wizard'
     _description = 'Doctor Monthly Appointment Report Wizard'
@@ -15,9 +22,9 @@ class AppointmentReportWizard(models.TransientModel):
     )
     year = fields.Integer(string="السنة", required=True, default=lambda self: datetime.today().year)
 
-    make_report = fields.Binary(string="تقرير PDF", readonly=True)
     report_name = fields.Char(string="اسم الملف")
 
+    @instrumented('appointment.report.wizard.action_generate_report')
     def action_generate_report(self):
         # تحويل الشهر والسنة إلى بداية ونهاية الشهر
         month = int(self.month)
@@ -25,8 +32,8 @@ class AppointmentReportWizard(models.TransientModel):
         start_date = datetime(year, month, 1)
         last_day = calendar.monthrange(year, month)[1]
         end_date = datetime(year, month, last_day, 23, 59, 59)
-        print('start_date',start_date)
-        print('end_date',end_date)
+        _logger.debug('start_date %s', start_date)
+        _logger.debug('end_date %s', end_date)
 
         # البحث عن المواعيد
         appointments = self.env['patient.appointment'].search([
@@ -36,13 +43,23 @@ class AppointmentReportWizard(models.TransientModel):
             ('is_reserved', '=', True),
         ])
 
-        print("Selected Doctor ID:", self.doctors_id.id)
-        print("Selected Doctor Name:", self.doctors_id.name)
-        print('appointments',appointments)
+        _logger.debug('Selected Doctor ID %s', self.doctors_id.id)
+        _logger.debug('Selected Doctor Name %s', self.doctors_id.name)
+        _logger.debug('appointments %s', appointments)
 
         # إعداد البيانات للتقرير
-        data = {
-            'doctor_name': self.doctors_id.name,
+        data = self._prepare_report_data(self.doctors_id, month, year, appointments)
+
+        # إنشاء التقرير في الخلفية
+        self.report_name = f"تقرير-{self.doctors_id.name}-{calendar.month_name[month]}-{year}.pdf"
+        return self.env['report.render.job'].enqueue(
+            'doctors_appointment.report_doctor_daily_appointments_template', {'data': data}, self.report_name,
+        )
+
+    @api.model
+    def _prepare_report_data(self, doctor, month, year, appointments):
+        return {
+            'doctor_name': doctor.name,
             'selected_month': f"{calendar.month_name[month]} {year}",
             'appointments': [
                 {
@@ -56,23 +73,48 @@ class AppointmentReportWizard(models.TransientModel):
             ],
         }
 
-        # إنشاء التقرير
-        try:
-            report_action = self.env.ref('doctors_appointment.report_doctor_daily_appointments_action')
-            pdf_content, _ = report_action._render_qweb_pdf(self.ids, data={'data': data})
-        except:
-            report_template = 'doctors_appointment.report_doctor_daily_appointments_template'
-            pdf_content, _ = self.env['ir.actions.report']._render_qweb_pdf(
-                report_template,
-                res_ids=self.ids,
-                data={'data': data}
-            )
-
-        self.make_report = base64.b64encode(pdf_content)
-        self.report_name = f"تقرير-{self.doctors_id.name}-{calendar.month_name[month]}-{year}.pdf"
 
-        return {
-            'type': 'ir.actions.act_url',
-            'url': f"/web/content?model=appointment.report.wizard&id={self.id}&field=make_report&filename_field=report_name&download=true",
-            'target': 'new',
-        }
\ No newline at end of file
+class AppointmentReportBundleWizard(models.TransientModel):
+    _name = 'appointment.report.bundle.wizard'
+    _description = 'All Doctors Monthly Appointment Reports Wizard'
+
+    month = fields.Selection(
+        [(str(i), calendar.month_name[i]) for i in range(1, 13)],
+        string="الشهر",
+        required=True
+    )
+    year = fields.Integer(string="السنة", required=True, default=lambda self: datetime.today().year)
+
+    @instrumented('appointment.report.bundle.wizard.action_generate_bundle')
+    def action_generate_bundle(self):
+        month = int(self.month)
+        year = self.year
+        start_date = datetime(year, month, 1)
+        last_day = calendar.monthrange(year, month)[1]
+        end_date = datetime(year, month, last_day, 23, 59, 59)
+
+        # استعلام واحد لمواعيد كل الدكاترة، وبعدين بنقسمها على كل دكتور
+        appointments = self.env['patient.appointment'].search([
+            ('doctors_id', '!=', False),
+            ('appointment_date', '>=', start_date),
+            ('appointment_date', '<=', end_date),
+            ('is_reserved', '=', True),
+        ], order='doctors_id, appointment_date')
+        appointment_ids_by_doctor = defaultdict(list)
+        for appointment in appointments:
+            appointment_ids_by_doctor[appointment.doctors_id].append(appointment.id)
+
+        # مواعيد كل دكتور بتفضل في نفس الـ prefetch بتاع كل المواعيد، فالحقول بتتقري مرة واحدة للكل
+        ReportWizard = self.env['appointment.report.wizard']
+        reports = [{
+            # رقم الدكتور في الاسم عشان دكتورين بنفس الاسم ميكتبوش على نفس الملف جوه الـ ZIP
+            'name': f"تقرير-{doctor.name}-{doctor.id}-{calendar.month_name[month]}-{year}.pdf",
+            'data': {'data': ReportWizard._prepare_report_data(
+                doctor, month, year, appointments.browse(ids).with_prefetch(appointments._prefetch_ids),
+            )},
+        } for doctor, ids in appointment_ids_by_doctor.items()]
+
+        return self.env['report.render.job'].enqueue_bundle(
+            'doctors_appointment.report_doctor_daily_appointments_template', reports,
+            f"تقارير-الدكاترة-{calendar.month_name[month]}-{year}.zip",
+        )
@@ -1,8 +1,13 @@
+import logging
+
 from odoo import models, fields
 from datetime import datetime, time
-import base64
 import calendar
 
+from odoo.addons.physiotherapy.tools import instrumented
+
+_logger = logging.getLogger(__name__)
+
 
 class AppointmentReportWizard(models.TransientModel):
     _name = 'doctor.report.wizard'
@@ -15,18 +20,18 @@ class AppointmentReportWizard(models.TransientModel):
     )
     year = fields.Integer(string="السنة", required=True, default=lambda self: datetime.today().year)
 
-    make_report = fields.Binary(string="تقرير PDF", readonly=True)
     report_name = fields.Char(string="اسم الملف")
 
+    @instrumented('doctor.report.wizard.action_generate_report_invoice')
     def action_generate_report_invoice(self):
         # تحويل الشهر والسنة إلى بداية ونهاية الشهر
         month = int(self.month)
         year = self.year
         start_date = datetime(year, month, 1)
-        print('start_date', start_date)
+        _logger.debug('start_date %s', start_date)
         last_day = calendar.monthrange(year, month)[1]
         end_date = datetime(year, month, last_day, 23, 59, 59)
-        print('end_date', end_date)
+        _logger.debug('end_date %s', end_date)
 
         # البحث عن المواعيد
         appointments = self.env['account.move'].search([
@@ -37,19 +42,19 @@ class AppointmentReportWizard(models.TransientModel):
             ('move_type', '=', 'out_invoice')
         ])
 
-        print('appointments', appointments)
+        _logger.debug('appointments %s', appointments)
 
         # الحصول على إجمالي المبالغ والعمولات
         total_amount = sum(appointments.mapped('amount_untaxed'))
-        print('total_amount', total_amount)
+        _logger.debug('total_amount %s', total_amount)
         total_commission = sum(appointments.mapped('commission_total'))
-        print('total_commission', total_commission)
+        _logger.debug('total_commission %s', total_commission)
 
         agents_data = []
 
         # اجلب كل الأطباء الفريدين
         unique_agents = appointments.mapped('agents_name_invoice')
-        print('unique_agents', unique_agents)
+        _logger.debug('unique_agents %s', unique_agents)
 
         for agent in unique_agents:
             # فلترة الفواتير الخاصة بهذا الطبيب
@@ -61,8 +66,9 @@ class AppointmentReportWizard(models.TransientModel):
             agent_invoices_count = len(agent_invoices)
             agent_salary = agent.salary if hasattr(agent, 'salary') else 0
 
-            print(
-                f'Doctor: {agent.name}, Total Amount: {agent_total_amount}, Total Commission: {agent_total_commission}, Salary: {agent_salary}, Invoices Count: {agent_invoices_count}')
+            _logger.debug(
+                'Doctor: %s, Total Amount: %s, Total Commission: %s, Salary: %s, Invoices Count: %s',
+                agent.name, agent_total_amount, agent_total_commission, agent_salary, agent_invoices_count)
 
             agents_data.append({
                 'agent_name': agent.name,
@@ -86,23 +92,8 @@ class AppointmentReportWizard(models.TransientModel):
             'agents_data': agents_data,
         }
 
-        # إنشاء التقرير
-        try:
-            report_action = self.env.ref('doctors_appointment.report_doctor_invoices_action')
-            pdf_content, _ = report_action._render_qweb_pdf(self.ids, data={'data': data})
-        except:
-            report_template = 'doctors_appointment.report_doctor_invoices_template'
-            pdf_content, _ = self.env['ir.actions.report']._render_qweb_pdf(
-                report_template,
-                res_ids=self.ids,
-                data={'data': data}
-            )
-
-        self.make_report = base64.b64encode(pdf_content)
+        # إنشاء التقرير في الخلفية
         self.report_name = f"تقرير-{calendar.month_name[month]}-{year}.pdf"
-
-        return {
-            'type': 'ir.actions.act_url',
-            'url': f"/web/content?model=doctor.report.wizard&id={self.id}&field=make_report&filename_field=report_name&download=true",
-            'target': 'new',
-        }
\ No newline at end of file
+        return self.env['report.render.job'].enqueue(
+            'doctors_appointment.report_doctor_invoices_template', {'data': data}, self.report_name,
+        )
\ No newline at end of file
@@ -1 +1,3 @@
+from . import controllers
 from . import models
+from .models.hooks import post_init_hook
@@ -3,18 +3,18 @@
     'name': "physiotherapy",
     'author': "My Company",
     'website': "https://www.yourcompany.com",
-    'version': '0.1',
+    'version': '0.3',
     'license': 'LGPL-3',
     'application': True,
     'installable': True,
     'category': 'Healthcare',
 
-    # 'post_init_hook': 'assign_country_codes_on_install',
+    'post_init_hook': 'post_init_hook',
 
 
 
     'depends': [
-        'base','account','account_commission'
+        'base','mail','hr','account','account_commission'
     ],
 
     'data': [
@@ -26,6 +26,7 @@
 
         # Data
         'data/sequence.xml',
+        'data/ir_cron.xml',
 
 
         # Views
@@ -33,6 +34,10 @@
         'views/res_partner_view.xml',
         'views/account_move_view.xml',
         'views/my_cases_views.xml',
+        'views/patient_assessment_views.xml',
+        'views/patient_duplicate_views.xml',
+        'views/subscription_schedule_views.xml',
+        'views/report_render_job_views.xml',
         'views/hr_employee_view.xml',
 
 
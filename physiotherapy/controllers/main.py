@@ -0,0 +1,30 @@
+import hmac
+
+from werkzeug.exceptions import NotFound
+
+from odoo import http
+from odoo.http import request, route
+from odoo.tools import config
+
+from ..tools import prometheus_text
+
+
+class PatientLookup(http.Controller):
+
+    @route('/physiotherapy/patient_lookup', methods=['POST'], type='json', auth='user')
+    def patient_lookup(self, term='', limit=20, **kwargs):
+        return request.env['res.partner'].reception_patient_lookup(term, limit=limit)
+
+
+class InstrumentationMetrics(http.Controller):
+
+    @route('/physiotherapy/metrics', methods=['GET'], type='http', auth='none', save_session=False)
+    def metrics(self, **kwargs):
+        # لازم physiotherapy_metrics_token في ملف الإعدادات، و Prometheus يبعته كـ Bearer token
+        token = config.get('physiotherapy_metrics_token')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not token or not hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+            raise NotFound()
+        return request.make_response(
+            prometheus_text(), headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')],
+        )
@@ -0,0 +1,93 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# الأعمدة الطبية اللي اتنقلت من res_partner إلى patient_assessment
+CLINICAL_COLUMNS = [
+    'diagnosis',
+    'rta',
+    'sport_injury',
+    'electrical_shock',
+    'burn',
+    'lifting_heavy_object',
+    'no_history_of_trauma',
+    'duration',
+    'htn',
+    'dm',
+    'osteoporosis',
+    'cardiac_problems',
+    'other_medical',
+    'surgical_history',
+    'pain',
+    'stiffness',
+    'weakness',
+    'neuro_deficit',
+    'other_chief',
+    'onset',
+    'pain_localized',
+    'pain_radiated',
+    'pain_constant',
+    'pain_intermittent',
+    'aggravated_by',
+    'relieved_by',
+    'patient_wheelchair',
+    'patient_assistive',
+    'patient_carried',
+    'patient_on_bed',
+    'patient_normal',
+    'gait_other',
+    'oriented',
+    'confused',
+    'vegetated',
+    'conscious_other',
+    'risk_time',
+    'risk_level',
+    'session',
+    'lazer',
+    'shock_wave',
+    'traction',
+    'edema',
+    'swelling',
+    'redness',
+    'hotness',
+    'muscle_weakness',
+    'muscle_spasm',
+    'muscle_atrophy',
+    'deformity',
+    'neuro_exam',
+    'active_rom',
+    'passive_rom',
+    'muscle_test',
+    'special_test',
+]
+
+
+def migrate(cr, version):
+    if not version:
+        return
+
+    cr.execute("""
+        SELECT column_name
+          FROM information_schema.columns
+         WHERE table_name = 'res_partner' AND column_name = ANY(%s)
+    """, [CLINICAL_COLUMNS])
+    columns = [row[0] for row in cr.fetchall()]
+    if not columns:
+        return
+
+    # كل مريض عنده بيانات طبية بياخد تقييم واحد بنفس البيانات
+    column_list = ", ".join(columns)
+    has_data = " OR ".join(f"{column} IS NOT NULL AND {column}::text NOT IN ('', 'false')" for column in columns)
+    cr.execute(f"""
+        INSERT INTO patient_assessment (
+            patient_id, doctor, date, create_uid, create_date, write_uid, write_date, {column_list}
+        )
+        SELECT id, doctor, COALESCE(write_date, create_date, now())::date,
+               write_uid, now() AT TIME ZONE 'UTC', write_uid, now() AT TIME ZONE 'UTC', {column_list}
+          FROM res_partner
+         WHERE is_patient AND ({has_data})
+    """)
+    _logger.info("Moved the clinical data of %s patients to patient.assessment", cr.rowcount)
+
+    for column in columns:
+        cr.execute(f"ALTER TABLE res_partner DROP COLUMN IF EXISTS {column}")
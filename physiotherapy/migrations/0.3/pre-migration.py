@@ -0,0 +1,20 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    if not version:
+        return
+
+    # نملا account_move.doctor_user_id بـ SQL قبل تحميل الموديول بدل ما الـ ORM يحسبه فاتورة فاتورة
+    cr.execute("ALTER TABLE account_move ADD COLUMN IF NOT EXISTS doctor_user_id integer")
+    cr.execute("""
+        UPDATE account_move m
+           SET doctor_user_id = e.user_id
+          FROM res_partner p
+          JOIN hr_employee e ON e.id = p.doctor
+         WHERE p.id = m.partner_id
+           AND m.doctor_user_id IS DISTINCT FROM e.user_id
+    """)
+    _logger.info("Filled the doctor user of %s invoices", cr.rowcount)
@@ -1,6 +1,10 @@
 from . import res_partner
 from . import account_move
 from . import my_cases
+from . import patient_assessment
+from . import patient_duplicate
+from . import subscription_schedule
+from . import report_render_job
 from . import res_user
 from . import hr_employee
 from . import hooks
\ No newline at end of file
@@ -1,11 +1,20 @@
+import logging
 from collections import defaultdict
 
-from odoo import models, fields, api
-from datetime import date
-from dateutil.relativedelta import relativedelta
+from psycopg2 import IntegrityError
 
-from odoo.osv import expression
-from odoo.tools import frozendict
+from odoo import models, fields, api, _
+
+from odoo.tools import frozendict, split_every
+
+from ..tools import instrumented
+
+_logger = logging.getLogger(__name__)
+
+# عدد الفواتير اللي بتتنشأ في كل create واحد (وcommit لو auto_commit)
+SUBSCRIPTION_CHUNK_SIZE = 200
+# أول مفتاح في pg_try_advisory_xact_lock(key, partner_id) لفواتير الاشتراكات
+SUBSCRIPTION_LOCK_KEY = 57301
 
 
 class AccountMove(models.Model):
@@ -22,6 +31,7 @@ class AccountMove(models.Model):
     mobile = fields.Char(related='partner_id.mobile', string="رقم الموبايل", store=True)
 
     invoice_created_months = fields.Integer(string="عدد الفواتير المنشأة", default=0)
+    subscription_key = fields.Char(string="مفتاح الاشتراك", copy=False, readonly=True)
     agents_name_invoice = fields.Many2many(
         'res.partner',
         string='الوكيل',
@@ -33,12 +43,8 @@ class AccountMove(models.Model):
         string='الوكيل',
     )
 
-    # doctor_user_id = fields.Many2one('res.users', compute='_compute_doctor_user_id', store=True)
-    #
-    # @api.depends('partner_id.doctor.user_id')
-    # def _compute_doctor_user_id(self):
-    #     for rec in self:
-    #         rec.doctor_user_id = rec.partner_id.doctor.user_id
+    # مستخدم دكتور المريض؛ مخزن عشان قاعدة صلاحيات الدكاترة متعملش join على الشركاء والموظفين
+    doctor_user_id = fields.Many2one('res.users', related='partner_id.doctor_user_id', store=True, index=True)
 
     # search_mobile = fields.Char(string="بحث بالموبايل", compute="_compute_dummy_mobile", store=False)
     #
@@ -66,88 +72,179 @@ class AccountMove(models.Model):
     #         else:
     #             record.end_date = False
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if not vals.get('invoice_date'):
+                vals['invoice_date'] = fields.Date.today()
+                vals['agents_name_invoice'] = vals.get('invoice_line_ids.agents')
+        return super(AccountMove, self).create(vals_list)
+
+    def init(self):
+        super().init()
+        # فاتورة واحدة بس لكل (اشتراك، شهر) حتى لو اشتغل أكتر من تشغيل في نفس الوقت
+        self._cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS account_move_subscription_key_uniq
+                ON account_move (subscription_key)
+             WHERE subscription_key IS NOT NULL
+        """)
+
+    @api.model
+    def _lock_subscription_partners(self, partner_ids):
+        """Take the transaction advisory lock of each partner and return the ids that got it.
+
+        Partners locked by another running transaction are left out, so that
+        overlapping runs skip them instead of invoicing them twice.
+        """
+        if not partner_ids:
+            return set()
+        self.env.cr.execute("""
+            SELECT partner_id
+              FROM unnest(%s::int[]) AS partner_id
+             WHERE pg_try_advisory_xact_lock(%s, partner_id)
+        """, [sorted(partner_ids), SUBSCRIPTION_LOCK_KEY])
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    @api.model
+    def _get_pending_subscription_templates(self, partner_id_from=None, partner_id_to=None):
+        """Return the subscription invoices whose months are not all generated yet."""
+        self.flush_model(['move_type', 'state', 'start_date', 'months', 'invoice_created_months', 'partner_id'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM account_move
+             WHERE move_type = 'out_invoice'
+               AND state != 'cancel'
+               AND start_date IS NOT NULL
+               AND months >= 0
+               AND COALESCE(invoice_created_months, 0) < months
+               AND (%(partner_id_from)s IS NULL OR partner_id >= %(partner_id_from)s)
+               AND (%(partner_id_to)s IS NULL OR partner_id <= %(partner_id_to)s)
+          ORDER BY id
+        """, {'partner_id_from': partner_id_from, 'partner_id_to': partner_id_to})
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
     @api.model
-    def create(self, vals):
-        if   not vals.get('invoice_date'):
-            vals['invoice_date'] = fields.Date.today()
-            vals['agents_name_invoice']=vals.get('invoice_line_ids.agents')
-        return super(AccountMove, self).create(vals)
-
-    def create_subscription_invoices(self):
-        subscription_invoices = self.search([
-            ('move_type', '=', 'out_invoice'),
-            ('state', '!=', 'cancel'),
-            ('months', '>=', 0),
-            ('start_date', '!=', False),
-        ])
+    def _get_existing_invoice_dates(self, partner_ids):
+        """Return the set of (partner_id, invoice_date) already invoiced, in one query."""
+        if not partner_ids:
+            return set()
+        self.flush_model(['move_type', 'state', 'partner_id', 'invoice_date'])
+        self.env.cr.execute("""
+            SELECT partner_id, invoice_date
+              FROM account_move
+             WHERE move_type = 'out_invoice'
+               AND state != 'cancel'
+               AND invoice_date IS NOT NULL
+               AND partner_id IN %s
+        """, [tuple(partner_ids)])
+        return set(self.env.cr.fetchall())
+
+    def write(self, vals):
+        if 'months' in vals or 'start_date' in vals:
+            # الشهور اللي لسه متفوترتش بتتخطط من جديد في التشغيل الجاي (المستخدمين صلاحيتهم قراءة بس على الجدول)
+            self.env['subscription.schedule'].sudo().search([
+                ('template_id', 'in', self.ids),
+                ('state', '=', 'planned'),
+            ]).unlink()
+            vals = dict(vals, invoice_created_months=0)
+        return super(AccountMove, self).write(vals)
+
+    def _mark_subscription_complete(self):
+        """Set the watermark of the subscriptions in self that have no planned month left."""
+        if not self:
+            return
+        self.env['subscription.schedule'].flush_model(['template_id', 'state'])
+        self.flush_recordset(['months', 'invoice_created_months'])
+        self.env.cr.execute("""
+            UPDATE account_move AS move
+               SET invoice_created_months = move.months
+             WHERE move.id IN %s
+               AND COALESCE(move.invoice_created_months, 0) < move.months
+               AND NOT EXISTS (
+                   SELECT 1
+                     FROM subscription_schedule AS schedule
+                    WHERE schedule.template_id = move.id AND schedule.state = 'planned'
+               )
+        """, [tuple(self.ids)])
+        self.invalidate_recordset(['invoice_created_months'])
+
+    @instrumented('account.move.create_subscription_invoices')
+    def create_subscription_invoices(self, until=None, partner_id_from=None, partner_id_to=None,
+                                     chunk_size=SUBSCRIPTION_CHUNK_SIZE, auto_commit=False):
+        """Invoice the due subscription months.
+
+        Several runs can work in parallel (e.g. one cron per partner id range
+        given by ``partner_id_from``/``partner_id_to``): partners are taken
+        with advisory locks and every invoice carries a unique
+        ``subscription_key``, so a month is never invoiced twice.
+        """
+        Schedule = self.env['subscription.schedule']
+        Schedule._plan_pending_templates(partner_id_from, partner_id_to)
+        if auto_commit:
+            self.env.cr.commit()
+        due_rows = Schedule._get_due_rows(until, partner_id_from, partner_id_to)
 
         totals_by_partner_month = defaultdict(float)
         salary_by_partner = {}
 
-        for record in subscription_invoices:
-            months_total = record.months
-            start_date = record.start_date
-            end_date = start_date + relativedelta(months=months_total)
-            invoice_template = record
-            partner_name = record.partner_id.name
-            salary = record.partner_id.salary or 0.0
-            salary_by_partner[partner_name] = salary
-
-            for month_index in range(1, months_total):
-                current_invoice_date = start_date + relativedelta(months=month_index)
-
-                existing = self.search_count([
-                    ('move_type', '=', 'out_invoice'),
-                    ('state', '!=', 'cancel'),
-                    ('partner_id', '=', record.partner_id.id),
-                    ('invoice_date', '=', current_invoice_date),
-                ])
-
-                if existing:
+        for row_ids in split_every(chunk_size, due_rows.ids):
+            locked_partners = self._lock_subscription_partners(Schedule.browse(row_ids).partner_id.ids)
+            rows = Schedule._filter_planned(row_ids).filtered(lambda row: row.partner_id.id in locked_partners)
+            existing_dates = self._get_existing_invoice_dates(rows.partner_id.ids)
+            invoice_vals_list = []
+            invoiced_rows = []
+            skipped_rows = Schedule
+
+            for row in rows:
+                invoice_template = row.template_id
+                partner_name = row.partner_id.name
+                salary_by_partner[partner_name] = row.partner_id.salary or 0.0
+
+                if (row.partner_id.id, row.due_date) in existing_dates:
+                    skipped_rows |= row
                     continue
+                existing_dates.add((row.partner_id.id, row.due_date))
 
-                line_vals = []
-                monthly_total = 0.0
-
-                for line in invoice_template.invoice_line_ids:
-                    line_total = line.quantity * line.price_unit
-                    monthly_total += line_total
-
-                    line_vals.append((0, 0, {
+                invoice_vals_list.append({
+                    'move_type': 'out_invoice',
+                    'partner_id': row.partner_id.id,
+                    'start_date': row.due_date,
+                    'invoice_date': row.due_date,
+                    'date': row.due_date,
+                    'months': 1,
+                    'subscription_key': f'{invoice_template.id}:{row.month_index}',
+                    'invoice_line_ids': [(0, 0, {
                         'name': line.name,
                         'quantity': line.quantity,
                         'price_unit': line.price_unit,
                         'product_id': line.product_id.id,
                         'account_id': line.account_id.id,
                         'tax_ids': [(6, 0, line.tax_ids.ids)],
-                    }))
-
-                invoice_vals = {
-                    'move_type': 'out_invoice',
-                    'partner_id': record.partner_id.id,
-                    'start_date': current_invoice_date,
-                    'invoice_date': current_invoice_date,
-                    'date': current_invoice_date,
-                    'months': 1,
-                    'invoice_line_ids': line_vals,
-                }
-
-                self.create(invoice_vals)
-
-                totals_by_partner_month[(partner_name, current_invoice_date.strftime('%Y-%m'))] += monthly_total
-
-            record.invoice_created_months = months_total
+                    }) for line in invoice_template.invoice_line_ids],
+                })
+                invoiced_rows.append(row.id)
+
+                totals_by_partner_month[(partner_name, row.due_date.strftime('%Y-%m'))] += row.amount
+
+            try:
+                with self.env.cr.savepoint():
+                    invoices = self.create(invoice_vals_list)
+            except IntegrityError:
+                # تشغيل تاني أنشأ نفس الشهور؛ الصفوف بتتعلم skipped في التشغيل الجاي
+                _logger.warning("Subscription invoices of schedule rows %s already exist, skipping chunk", rows.ids)
+                continue
+            skipped_rows.write({'state': 'skipped'})
+            Schedule._mark_invoiced(invoiced_rows, invoices.ids)
+            rows.template_id._mark_subscription_complete()
+            if auto_commit:
+                self.env.cr.commit()
 
-        print("\n===== Monthly Totals by Partner =====")
         for (partner_name, month), total in sorted(totals_by_partner_month.items()):
             salary = salary_by_partner.get(partner_name, 0.0)
-            print(f"Partner: {partner_name}, Month: {month}, Total: {total:.2f}, Salary: {salary:.2f}")
+            _logger.debug("Partner: %s, Month: %s, Total: %.2f, Salary: %.2f", partner_name, month, total, salary)
             if total == salary * 2:
-                print('dd')
                 self.commission_total=salary+ 0.05
 
-                print(self.commission_total)
-
     # @api.model
     # def create(self, vals):
     #     move = super().create(vals)
@@ -194,22 +291,7 @@ class AccountMove(models.Model):
     #
     #     return move
     #
-    @api.model
-    def search_fetch(self, domain, field_names, offset=0, limit=None, order=None):
-        user = self.env.user
-
-        # Check if user is in the doctor group
-        if user.has_group('doctors_appointment.group_doctors_appointment_doctor'):
-            domain = expression.AND([
-                domain,
-                [('partner_id.doctor.user_id', '=', user.id)]
-            ])
-
-        return super(AccountMove, self).search_fetch(
-            domain, field_names, offset=offset, limit=limit, order=order
-        )
-
-
+    @instrumented('account.move.action_post')
     def action_post(self):
 
         for rec in self:
@@ -223,24 +305,38 @@ class AccountMoveLine(models.Model):
     _inherit = 'account.move.line'
 
     @api.model
-    def create(self, vals):
-        move = self.env['account.move'].browse(vals.get('move_id'))
-        partner = move.partner_id
+    def _get_tax_exempt_move_ids(self, move_ids):
+        """Return the ids of the moves whose partner is tax exempt (has a national address)."""
+        moves = self.env['account.move'].browse(move_ids)
+        # partner_id و national_address بيتقروا مرة واحدة لكل الفواتير بالـ prefetch
+        return set(moves.filtered(lambda move: move.partner_id.national_address).ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        exempt_move_ids = self._get_tax_exempt_move_ids({vals['move_id'] for vals in vals_list if vals.get('move_id')})
         # لو المريض له عنوان وطني، نشيل الضرائب
-        if partner and partner.national_address:
-            vals['tax_ids'] = [(5, 0, 0)]
-        return super().create(vals)
+        if exempt_move_ids:
+            vals_list = [
+                dict(vals, tax_ids=[(5, 0, 0)]) if vals.get('move_id') in exempt_move_ids else vals
+                for vals in vals_list
+            ]
+        return super().create(vals_list)
 
     def write(self, vals):
-        for line in self:
-            partner = line.move_id.partner_id
-            if partner and partner.national_address:
-                vals['tax_ids'] = [(5, 0, 0)]
-        return super().write(vals)
+        exempt_move_ids = self._get_tax_exempt_move_ids(self.move_id.ids)
+        exempt_lines = self.filtered(lambda line: line.move_id.id in exempt_move_ids)
+        if not exempt_lines:
+            return super().write(vals)
+        other_lines = self - exempt_lines
+        if other_lines:
+            super(AccountMoveLine, other_lines).write(vals)
+        return super(AccountMoveLine, exempt_lines).write(dict(vals, tax_ids=[(5, 0, 0)]))
 
     @api.depends('tax_ids', 'currency_id', 'partner_id', 'analytic_distribution', 'balance', 'partner_id',
                  'move_id.partner_id', 'price_unit', 'quantity')
     def _compute_all_tax(self):
+        # سطور فواتير الاشتراكات متكررة (نفس المنتج والسعر والضرائب)، فبنحسب compute_all مرة لكل مجموعة
+        compute_all_memo = {}
         for line in self:
             sign = line.move_id.direction_sign
 
@@ -263,17 +359,24 @@ class AccountMoveLine(models.Model):
                 handle_price_include = False
                 quantity = 1
 
-            compute_all_currency = line.tax_ids.compute_all(
-                amount_currency,
-                currency=line.currency_id,
-                quantity=quantity,
-                product=line.product_id,
-                partner=line.move_id.partner_id or line.partner_id,
-                is_refund=line.is_refund,
-                handle_price_include=handle_price_include,
-                include_caba_tags=line.move_id.always_tax_exigible,
-                fixed_multiplicator=sign,
+            partner = line.move_id.partner_id or line.partner_id
+            memo_key = (
+                tuple(line.tax_ids.ids), amount_currency, line.currency_id.id, quantity, line.product_id.id,
+                partner.id, line.is_refund, handle_price_include, line.move_id.always_tax_exigible, sign,
             )
+            compute_all_currency = compute_all_memo.get(memo_key)
+            if compute_all_currency is None:
+                compute_all_currency = compute_all_memo[memo_key] = line.tax_ids.compute_all(
+                    amount_currency,
+                    currency=line.currency_id,
+                    quantity=quantity,
+                    product=line.product_id,
+                    partner=partner,
+                    is_refund=line.is_refund,
+                    handle_price_include=handle_price_include,
+                    include_caba_tags=line.move_id.always_tax_exigible,
+                    fixed_multiplicator=sign,
+                )
 
             rate = line.amount_currency / line.balance if line.balance else 1
             line.compute_all_tax_dirty = True
@@ -306,4 +409,9 @@ class AccountMoveLine(models.Model):
                 }
 
 
+class AccountInvoiceLineAgent(models.Model):
+    _inherit = 'account.invoice.line.agent'
 
+    @instrumented('account.invoice.line.agent._compute_amount')
+    def _compute_amount(self):
+        return super(AccountInvoiceLineAgent, self)._compute_amount()
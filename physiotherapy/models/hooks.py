@@ -1,5 +1,2 @@
-from odoo import api, SUPERUSER_ID
-
-def post_init_hook(cr, registry):
-    env = api.Environment(cr, SUPERUSER_ID, {})
-    env['res.country']._assign_codes_on_install()
+def post_init_hook(env):
+    env['res.country'].assign_missing_state_codes()
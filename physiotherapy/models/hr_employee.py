@@ -5,6 +5,32 @@ class HrEmployee(models.Model):
     _inherit = 'hr.employee'
 
     user_id = fields.Many2one('res.users', string="User")
+    # كل الشركاء اللي بنفس اسم الموظف؛ بيتحدثوا كمان لما شريك يتعمل أو يتغير اسمه (res.partner)
+    agent_partner_ids = fields.Many2many(
+        'res.partner',
+        'hr_employee_agent_partner_rel',
+        'employee_id',
+        'partner_id',
+        string="الوكيل",
+        compute='_compute_agent_partner_ids',
+        store=True,
+        readonly=False,
+    )
+
+    @api.depends('name')
+    def _compute_agent_partner_ids(self):
+        # بحث واحد لكل الأسماء بدل بحث لكل موظف
+        names = list(set(self.filtered('name').mapped('name')))
+        partner_ids_by_name = {}
+        if names:
+            for partner in self.env['res.partner'].search([('name', 'in', names)]):
+                partner_ids_by_name.setdefault(partner.name, []).append(partner.id)
+        for employee in self:
+            employee.agent_partner_ids = [(6, 0, partner_ids_by_name.get(employee.name, []))]
+
+    def _get_agent_partner_map(self):
+        """Return {employee_id: agent partner ids} for the employees in self."""
+        return {employee.id: employee.agent_partner_ids.ids for employee in self}
 
     # @api.model
     # def create(self, vals):
@@ -0,0 +1,101 @@
+from odoo import models, fields, api
+
+
+class PatientAssessment(models.Model):
+    _name = 'patient.assessment'
+    _description = 'Patient Assessment'
+    _inherit = ['mail.thread']
+    _order = 'date desc, id desc'
+    _rec_name = 'patient_id'
+
+    patient_id = fields.Many2one('res.partner', string="المريض", required=True, index=True, ondelete='cascade',
+                                 domain=[('is_patient', '=', True)])
+    doctor = fields.Many2one('hr.employee', string='الأخصائي')
+    date = fields.Date(string="تاريخ الزيارة", default=fields.Date.context_today, required=True)
+
+    diagnosis = fields.Char(string="التشخيص", tracking=True)
+
+    # Past History
+    rta = fields.Boolean(string="RTA")
+    sport_injury = fields.Boolean(string="Sport Injury")
+    electrical_shock = fields.Boolean(string="Electrical Shock")
+    burn = fields.Boolean(string="Burn")
+    lifting_heavy_object = fields.Boolean(string="Lifting Heavy Object")
+    no_history_of_trauma = fields.Boolean(string="No History of Trauma")
+    duration = fields.Char(string="Duration")
+
+    # Medical history
+    htn = fields.Boolean(string="HTN")
+    dm = fields.Boolean(string="D.M")
+    osteoporosis = fields.Boolean(string="Osteoporosis")
+    cardiac_problems = fields.Boolean(string="Cardiac Problems")
+    other_medical = fields.Char(string="Other Medical")
+    surgical_history = fields.Text(string="Surgical History")
+
+    # Chief Complaint
+    pain = fields.Boolean(string="Pain")
+    stiffness = fields.Boolean(string="Stiffness")
+    weakness = fields.Boolean(string="Weakness")
+    neuro_deficit = fields.Boolean(string="Neurological Deficit")
+    other_chief = fields.Text(string="Other Complaint")
+
+    # Pain Description
+    onset = fields.Char(string="Onset")
+    pain_localized = fields.Boolean(string="Localized")
+    pain_radiated = fields.Boolean(string="Radiated")
+    pain_constant = fields.Boolean(string="Constant")
+    pain_intermittent = fields.Boolean(string="Intermittent")
+    aggravated_by = fields.Text(string="Aggravated By", tracking=True)
+    relieved_by = fields.Text(string="Relieved By", tracking=True)
+
+    # Patient condition on arrival
+    patient_wheelchair = fields.Boolean(string="Wheelchair")
+    patient_assistive = fields.Boolean(string="Walking with assistive device")
+    patient_carried = fields.Boolean(string="Carried by mother")
+    patient_on_bed = fields.Boolean(string="On bed")
+    patient_normal = fields.Boolean(string="Walking normal")
+    gait_other = fields.Char(string="Gait - Other")
+
+    # Consciousness
+    oriented = fields.Boolean(string="Oriented")
+    confused = fields.Boolean(string="Confused")
+    vegetated = fields.Boolean(string="Vegetated")
+    conscious_other = fields.Char(string="Conscious - Other")
+
+    # Risk of falls
+    risk_time = fields.Char(string="Time (seconds)")
+    risk_level = fields.Selection([
+        ('no', 'No Risk'),
+        ('mild', 'Mild Risk'),
+        ('moderate', 'Moderate Risk'),
+        ('high', 'High Risk')
+    ], string="Risk of Falls")
+
+    # Session details
+    session = fields.Char(string="Session")
+    lazer = fields.Char(string="Lazer")
+    shock_wave = fields.Char(string="Shock Wave")
+    traction = fields.Char(string="Traction")
+
+    # Symptoms
+    edema = fields.Boolean(string="Edema")
+    swelling = fields.Boolean(string="Swelling")
+    redness = fields.Boolean(string="Redness")
+    hotness = fields.Boolean(string="Hotness")
+    muscle_weakness = fields.Boolean(string="Muscle Weakness")
+    muscle_spasm = fields.Boolean(string="Muscle Spasm")
+    muscle_atrophy = fields.Boolean(string="Muscle Atrophy")
+
+    deformity = fields.Text(string="Deformity")
+
+    # Examination
+    neuro_exam = fields.Text(string="Neurological Examination")
+    active_rom = fields.Text(string="Active Range of Motion")
+    passive_rom = fields.Text(string="Passive Range of Motion")
+    muscle_test = fields.Text(string="Manual Muscle Test")
+    special_test = fields.Text(string="Special Test")
+
+    @api.onchange('patient_id')
+    def _onchange_patient_id(self):
+        if self.patient_id and self.patient_id.doctor:
+            self.doctor = self.patient_id.doctor
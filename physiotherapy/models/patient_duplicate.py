@@ -0,0 +1,128 @@
+import re
+from collections import defaultdict
+
+from odoo import models, fields, api
+
+# أكبر مجموعة بنقارن أزواجها؛ المجموعات الأكبر (زي رقم موبايل عام) بيتم تجاهلها
+MAX_BLOCK_SIZE = 20
+
+ARABIC_NORMALIZATION = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه', 'ى': 'ي', 'ؤ': 'و', 'ئ': 'ي',
+})
+ARABIC_DIACRITICS = re.compile('[\u064B-\u0652\u0640]')
+VOWELS = re.compile('[aeiouyhwاوي]')
+SOUNDS_ALIKE = str.maketrans({
+    'q': 'k', 'c': 'k', 'z': 's', 'v': 'f', 'p': 'b',
+    'ث': 'س', 'ص': 'س', 'ذ': 'ز', 'ظ': 'ز', 'ض': 'د', 'ط': 'ت', 'ق': 'ك', 'ه': 'ح', 'ع': 'ء',
+})
+
+
+def phonetic_key(name):
+    """Return a spelling-insensitive key for a patient name (Arabic or Latin)."""
+    name = ARABIC_DIACRITICS.sub('', (name or '').lower()).translate(ARABIC_NORMALIZATION)
+    tokens = []
+    for token in re.findall(r'\w+', name):
+        token = token.translate(SOUNDS_ALIKE)
+        token = token[:1] + VOWELS.sub('', token[1:])
+        token = re.sub(r'(.)\1+', r'\1', token)
+        if token and not token.isdigit():
+            tokens.append(token)
+    return ' '.join(sorted(tokens))
+
+
+def mobile_key(mobile):
+    """Return the last 9 digits of a mobile, so 05xx / +9665xx / 9665xx match."""
+    digits = re.sub(r'\D', '', mobile or '')
+    return digits[-9:] if len(digits) >= 7 else False
+
+
+def identity_key(identity):
+    key = re.sub(r'\W', '', identity or '').upper()
+    return key if len(key) >= 5 else False
+
+
+class PatientDuplicateCandidate(models.Model):
+    _name = 'patient.duplicate.candidate'
+    _description = 'Patient Duplicate Candidate'
+    _order = 'state, id desc'
+
+    patient_a_id = fields.Many2one('res.partner', string="المريض 1", required=True, ondelete='cascade')
+    patient_b_id = fields.Many2one('res.partner', string="المريض 2", required=True, ondelete='cascade')
+    reason = fields.Selection([
+        ('mobile', 'نفس رقم الموبايل'),
+        ('identity', 'نفس رقم الهوية'),
+        ('name', 'اسم متشابه'),
+    ], string="السبب", required=True)
+    state = fields.Selection([
+        ('pending', 'للمراجعة'),
+        ('merged', 'تم الدمج'),
+        ('dismissed', 'ليس مكرر'),
+    ], string="الحالة", default='pending', required=True, index=True)
+
+    _sql_constraints = [
+        ('patient_pair_uniq', 'unique(patient_a_id, patient_b_id)', "هذا الزوج موجود بالفعل في قائمة المراجعة."),
+    ]
+
+    @api.model
+    def _cron_detect_duplicate_patients(self):
+        """Queue candidate duplicate patients, blocking on mobile, identity and phonetic name."""
+        Partner = self.env['res.partner']
+        Partner.flush_model(['is_patient', 'active', 'name', 'mobile', 'identity_info'])
+        self.env.cr.execute("""
+            SELECT id, name, mobile, identity_info
+              FROM res_partner
+             WHERE is_patient AND active
+        """)
+
+        blocks = defaultdict(list)
+        for partner_id, name, mobile, identity in self.env.cr.fetchall():
+            for reason, key in (('mobile', mobile_key(mobile)),
+                                ('identity', identity_key(identity)),
+                                ('name', phonetic_key(name))):
+                if key:
+                    blocks[(reason, key)].append(partner_id)
+
+        pairs = {}
+        # الموبايل والهوية أقوى من الاسم، فبيتسجلوا الأول
+        reason_order = {'mobile': 0, 'identity': 1, 'name': 2}
+        for (reason, _key), partner_ids in sorted(blocks.items(), key=lambda item: reason_order[item[0][0]]):
+            if len(partner_ids) < 2 or len(partner_ids) > MAX_BLOCK_SIZE:
+                continue
+            partner_ids.sort()
+            for index, patient_a in enumerate(partner_ids):
+                for patient_b in partner_ids[index + 1:]:
+                    pairs.setdefault((patient_a, patient_b), reason)
+        if not pairs:
+            return
+
+        self.flush_model(['patient_a_id', 'patient_b_id'])
+        self.env.cr.execute("SELECT patient_a_id, patient_b_id FROM patient_duplicate_candidate")
+        for pair in self.env.cr.fetchall():
+            pairs.pop(pair, None)
+
+        self.create([{
+            'patient_a_id': patient_a,
+            'patient_b_id': patient_b,
+            'reason': reason,
+        } for (patient_a, patient_b), reason in pairs.items()])
+
+    def action_merge(self):
+        self.ensure_one()
+        return {
+            'name': 'دمج المرضى',
+            'type': 'ir.actions.act_window',
+            'res_model': 'base.partner.merge.automatic.wizard',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {
+                'active_model': 'res.partner',
+                'active_ids': [self.patient_a_id.id, self.patient_b_id.id],
+            }
+        }
+
+    def action_mark_merged(self):
+        self.write({'state': 'merged'})
+
+    def action_dismiss(self):
+        self.write({'state': 'dismissed'})
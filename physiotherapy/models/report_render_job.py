@@ -0,0 +1,186 @@
+import io
+import logging
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+from ..tools import instrumented
+
+_logger = logging.getLogger(__name__)
+
+# أقصى عدد تقارير بتتجهز في نفس الوقت في ملف ZIP واحد (كل واحد بيفتح cursor و wkhtmltopdf)
+BUNDLE_MAX_WORKERS = 4
+# تقرير فضل running أكتر من كده معناه إن الـ worker اتقفل في النص (مثلًا limit_time_real للكرون)
+REPORT_JOB_TIMEOUT = timedelta(minutes=30)
+# عدد مرات المحاولة قبل ما التقرير يتعلم failed
+REPORT_JOB_MAX_ATTEMPTS = 3
+
+
+class ReportRenderJob(models.Model):
+    _name = 'report.render.job'
+    _description = 'Background Report Render Job'
+    _order = 'id desc'
+
+    name = fields.Char(string="اسم الملف", required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string="المستخدم", required=True, readonly=True, index=True,
+                              default=lambda self: self.env.user)
+    report_ref = fields.Char(string="التقرير", required=True, readonly=True)
+    data = fields.Json(readonly=True)
+    is_bundle = fields.Boolean(string="ملف ZIP", readonly=True)
+    state = fields.Selection([
+        ('queued', 'في الانتظار'),
+        ('running', 'جاري التجهيز'),
+        ('done', 'جاهز'),
+        ('failed', 'فشل'),
+    ], string="الحالة", default='queued', required=True, readonly=True, index=True)
+    progress = fields.Integer(string="نسبة التقدم", readonly=True)
+    attempts = fields.Integer(string="عدد المحاولات", readonly=True)
+    attachment_id = fields.Many2one('ir.attachment', string="الملف", readonly=True)
+    error = fields.Text(string="الخطأ", readonly=True)
+
+    @api.model
+    def enqueue(self, report_ref, data, file_name):
+        """Queue the PDF rendering of ``report_ref`` from ``data`` and return the notification action.
+
+        ``data`` must hold everything the template needs: the job may run long
+        after the wizard that queued it has been vacuumed.
+        """
+        # المستخدمين معندهمش صلاحية create على الجوبز، فبننشئها بـ sudo باسم المستخدم الحالي
+        return self.sudo().create({
+            'user_id': self.env.uid,
+            'name': file_name,
+            'report_ref': report_ref,
+            'data': data,
+        })._queued_notification()
+
+    @api.model
+    def enqueue_bundle(self, report_ref, reports, file_name):
+        """Queue one ZIP with a PDF of ``report_ref`` per ``{'name', 'data'}`` entry of ``reports``."""
+        return self.sudo().create({
+            'user_id': self.env.uid,
+            'name': file_name,
+            'report_ref': report_ref,
+            'data': reports,
+            'is_bundle': True,
+        })._queued_notification()
+
+    def _queued_notification(self):
+        self.env.ref('physiotherapy.ir_cron_process_report_jobs')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'info',
+                'title': self.name,
+                'message': "جاري تجهيز التقرير، هيوصلك إشعار لما يكون جاهز للتحميل.",
+                'next': self.env['ir.actions.act_window']._for_xml_id('physiotherapy.action_report_render_job'),
+            },
+        }
+
+    @api.model
+    def _recover_stale_jobs(self):
+        """Requeue the jobs left running by a killed worker, or fail them after too many attempts."""
+        stale_jobs = self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - REPORT_JOB_TIMEOUT),
+        ])
+        retry_jobs = stale_jobs.filtered(lambda job: job.attempts < REPORT_JOB_MAX_ATTEMPTS)
+        retry_jobs.write({'state': 'queued', 'progress': 0})
+        for job in stale_jobs - retry_jobs:
+            _logger.warning("Report job %s was interrupted %s times, giving up", job.id, job.attempts)
+            job.write({'state': 'failed', 'progress': 0, 'error': "انتهى الوقت المسموح لتجهيز التقرير"})
+            job._notify_user("danger", "تعذر تجهيز التقرير %s" % job.name)
+
+    @api.model
+    def _cron_process_jobs(self, limit=10):
+        self._recover_stale_jobs()
+        self.env.cr.commit()
+        for _ in range(limit):
+            # SKIP LOCKED عشان لو أكتر من worker شغال ميمسكوش نفس التقرير
+            self.env.cr.execute("""
+                SELECT id
+                  FROM report_render_job
+                 WHERE state = 'queued'
+              ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """)
+            row = self.env.cr.fetchone()
+            if not row:
+                break
+            job = self.browse(row[0])
+            job.write({'state': 'running', 'progress': 10, 'attempts': job.attempts + 1})
+            self.env.cr.commit()
+            job._render()
+            self.env.cr.commit()
+
+    @instrumented('report.render.job._render')
+    def _render(self):
+        self.ensure_one()
+        try:
+            with self.env.cr.savepoint():
+                if self.is_bundle:
+                    content, mimetype = self._render_bundle(), 'application/zip'
+                else:
+                    Report = self.env['ir.actions.report'].with_user(self.user_id).with_context(lang=self.user_id.lang)
+                    content, mimetype = Report._render_qweb_pdf(self.report_ref, data=self.data)[0], 'application/pdf'
+        except Exception as error:
+            _logger.exception("Rendering report job %s failed", self.id)
+            self.write({'state': 'failed', 'progress': 0, 'error': str(error)})
+            self._notify_user("danger", "تعذر تجهيز التقرير %s" % self.name)
+            return
+        attachment = self.env['ir.attachment'].create({
+            'name': self.name,
+            'raw': content,
+            'mimetype': mimetype,
+            'res_model': self._name,
+            'res_id': self.id,
+        })
+        self.write({'state': 'done', 'progress': 100, 'attachment_id': attachment.id})
+        self._notify_user("success", "التقرير %s جاهز للتحميل من قائمة تقاريري" % self.name)
+
+    def _render_bundle(self):
+        """Render the PDFs of the bundle in parallel and return them zipped.
+
+        Each thread works on its own cursor; the heavy part (wkhtmltopdf) runs
+        in separate processes, so the renders spread over the CPU cores.
+        """
+        registry = self.env.registry
+        uid = self.user_id.id
+        context = dict(self.env.context, lang=self.user_id.lang)
+        report_ref = self.report_ref
+
+        def render(report):
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                return report['name'], env['ir.actions.report']._render_qweb_pdf(report_ref, data=report['data'])[0]
+
+        reports = self.data or []
+        workers = max(1, min(len(reports), os.cpu_count() or 1, BUNDLE_MAX_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pdfs = list(executor.map(render, reports))
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, pdf_content in pdfs:
+                archive.writestr(name, pdf_content)
+        return buffer.getvalue()
+
+    def _notify_user(self, notification_type, message):
+        self.env['bus.bus']._sendone(self.user_id.partner_id, 'simple_notification', {
+            'type': notification_type,
+            'title': self.name,
+            'message': message,
+            'sticky': notification_type == 'danger',
+        })
+
+    def action_download(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f"/web/content/{self.attachment_id.id}?download=true",
+            'target': 'new',
+        }
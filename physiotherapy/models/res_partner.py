@@ -1,7 +1,15 @@
-from datetime import date
-from odoo import models, fields, api
+import calendar
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
 from odoo.osv import expression
+from odoo.tools.sql import create_index
+
+# month * 100 + day of birth_date, backed by res_partner_patient_birthday_index
+BIRTHDAY_KEY_SQL = "(date_part('month', birth_date::timestamp) * 100 + date_part('day', birth_date::timestamp))"
+# mobile digits only, backed by res_partner_patient_mobile_index
+MOBILE_DIGITS_SQL = "regexp_replace(mobile, '[^0-9]', '', 'g')"
 
 
 class Registration(models.Model):
@@ -12,6 +20,8 @@ class Registration(models.Model):
     code = fields.Char(default='new', readonly=1, string="الكود")
     birth_date = fields.Date(string="تاريخ الميلاد")
     age = fields.Integer(string="العمر", compute="_compute_age", store=True)
+    current_age = fields.Integer(string="العمر الحالي", compute="_compute_current_age",
+                                 search="_search_current_age")
     gender = fields.Selection([
         ('m', 'Male'),
         ('f', 'Female'),
@@ -26,89 +36,13 @@ class Registration(models.Model):
     identity_info = fields.Text(string="رقم الهوية")
 
     doctor = fields.Many2one('hr.employee', string='الأخصائي')
+    doctor_user_id = fields.Many2one('res.users', related='doctor.user_id', store=True, index=True)
     sales_person = fields.Many2one('res.users', string='الأخصائي')
 
-    diagnosis = fields.Char(string="التشخيص", tracking=True)
-
-    # Past History
-    rta = fields.Boolean(string="RTA")
-    sport_injury = fields.Boolean(string="Sport Injury")
-    electrical_shock = fields.Boolean(string="Electrical Shock")
-    burn = fields.Boolean(string="Burn")
-    lifting_heavy_object = fields.Boolean(string="Lifting Heavy Object")
-    no_history_of_trauma = fields.Boolean(string="No History of Trauma")
-    duration = fields.Char(string="Duration")
-
-    # Medical history
-    htn = fields.Boolean(string="HTN")
-    dm = fields.Boolean(string="D.M")
-    osteoporosis = fields.Boolean(string="Osteoporosis")
-    cardiac_problems = fields.Boolean(string="Cardiac Problems")
-    other_medical = fields.Char(string="Other Medical")
-    surgical_history = fields.Text(string="Surgical History")
-
-    # Chief Complaint
-    pain = fields.Boolean(string="Pain")
-    stiffness = fields.Boolean(string="Stiffness")
-    weakness = fields.Boolean(string="Weakness")
-    neuro_deficit = fields.Boolean(string="Neurological Deficit")
-    other_chief = fields.Text(string="Other Complaint")
-
-    # Pain Description
-    onset = fields.Char(string="Onset")
-    pain_localized = fields.Boolean(string="Localized")
-    pain_radiated = fields.Boolean(string="Radiated")
-    pain_constant = fields.Boolean(string="Constant")
-    pain_intermittent = fields.Boolean(string="Intermittent")
-    aggravated_by = fields.Text(string="Aggravated By", tracking=True)
-    relieved_by = fields.Text(string="Relieved By", tracking=True)
-
-    # Patient condition on arrival
-    patient_wheelchair = fields.Boolean(string="Wheelchair")
-    patient_assistive = fields.Boolean(string="Walking with assistive device")
-    patient_carried = fields.Boolean(string="Carried by mother")
-    patient_on_bed = fields.Boolean(string="On bed")
-    patient_normal = fields.Boolean(string="Walking normal")
-    gait_other = fields.Char(string="Gait - Other")
-
-    # Consciousness
-    oriented = fields.Boolean(string="Oriented")
-    confused = fields.Boolean(string="Confused")
-    vegetated = fields.Boolean(string="Vegetated")
-    conscious_other = fields.Char(string="Conscious - Other")
-
-    # Risk of falls
-    risk_time = fields.Char(string="Time (seconds)")
-    risk_level = fields.Selection([
-        ('no', 'No Risk'),
-        ('mild', 'Mild Risk'),
-        ('moderate', 'Moderate Risk'),
-        ('high', 'High Risk')
-    ], string="Risk of Falls")
-
-    # Session details
-    session = fields.Char(string="Session")
-    lazer = fields.Char(string="Lazer")
-    shock_wave = fields.Char(string="Shock Wave")
-    traction = fields.Char(string="Traction")
-
-    # Symptoms
-    edema = fields.Boolean(string="Edema")
-    swelling = fields.Boolean(string="Swelling")
-    redness = fields.Boolean(string="Redness")
-    hotness = fields.Boolean(string="Hotness")
-    muscle_weakness = fields.Boolean(string="Muscle Weakness")
-    muscle_spasm = fields.Boolean(string="Muscle Spasm")
-    muscle_atrophy = fields.Boolean(string="Muscle Atrophy")
-
-    deformity = fields.Text(string="Deformity")
-
-    # Examination
-    neuro_exam = fields.Text(string="Neurological Examination")
-    active_rom = fields.Text(string="Active Range of Motion")
-    passive_rom = fields.Text(string="Passive Range of Motion")
-    muscle_test = fields.Text(string="Manual Muscle Test")
-    special_test = fields.Text(string="Special Test")
+    assessment_ids = fields.One2many('patient.assessment', 'patient_id', string="التقييمات")
+    assessment_count = fields.Integer(compute='_compute_assessment_stats')
+    last_assessment_id = fields.Many2one('patient.assessment', string="آخر تقييم",
+                                         compute='_compute_assessment_stats')
 
     show_appointment_button = fields.Boolean(compute="_compute_show_appointment_button")
 
@@ -117,6 +51,28 @@ class Registration(models.Model):
         for rec in self:
             rec.show_appointment_button = rec.is_patient
 
+    def _compute_assessment_stats(self):
+        # عدد التقييمات لكل المرضى في استعلام واحد
+        counts = {
+            patient.id: count
+            for patient, count in self.env['patient.assessment']._read_group(
+                [('patient_id', 'in', self.ids)], ['patient_id'], ['__count'])
+        }
+        # وآخر تقييم بنفس ترتيب patient.assessment (التاريخ ثم الرقم)، عشان الزيارة المسجلة بتاريخ قديم متبقاش الأخيرة
+        last_ids = {}
+        if self.ids:
+            self.env['patient.assessment'].flush_model(['patient_id', 'date'])
+            self.env.cr.execute("""
+                SELECT DISTINCT ON (patient_id) patient_id, id
+                  FROM patient_assessment
+                 WHERE patient_id IN %s
+              ORDER BY patient_id, date DESC, id DESC
+            """, [tuple(self.ids)])
+            last_ids = dict(self.env.cr.fetchall())
+        for rec in self:
+            rec.last_assessment_id = last_ids.get(rec.id, False)
+            rec.assessment_count = counts.get(rec.id, 0)
+
     # @api.constrains('is_patient', 'doctor')
     # def _check_required_fields_for_patient(self):
     #     for rec in self:
@@ -138,14 +94,29 @@ class Registration(models.Model):
         store=True
     )
 
-    @api.depends('doctor')
+    @api.depends('doctor', 'doctor.agent_partner_ids')
     def _get_agents(self):
+        # خريطة الأخصائي -> الوكلاء تتحمل مرة واحدة لكل المجموعة
+        agents_by_doctor = self.doctor._get_agent_partner_map()
         for rec in self:
-            partner = self.env['res.partner'].search([('name', '=', rec.doctor.name)])
-            if partner:
-                rec.agent_ids = [(6, 0, partner.ids)]
+            agent_ids = agents_by_doctor.get(rec.doctor.id)
+            if agent_ids:
+                rec.agent_ids = [(6, 0, agent_ids)]
             else:
-                rec.agent_ids = [(5, 0, 0, [])]
+                rec.agent_ids = [(5, 0, 0)]
+
+    @api.model
+    def _refresh_employee_agents(self, names):
+        """Recompute the agent link of the employees named in ``names`` and the agents of their patients."""
+        names = [name for name in names if name]
+        if not names:
+            return
+        employees = self.env['hr.employee'].sudo().search([('name', 'in', names)])
+        if not employees:
+            return
+        self.env.add_to_compute(employees._fields['agent_partner_ids'], employees)
+        patients = self.sudo().search([('doctor', 'in', employees.ids)])
+        self.env.add_to_compute(self._fields['agent_ids'], patients)
 
     @api.onchange('nationality_id')
     def _onchange_nationality(self):
@@ -157,27 +128,50 @@ class Registration(models.Model):
     @api.onchange('state_code')
     def _onchange_state_code(self):
         if self.state_code:
-            country = self.env['res.country'].search([('state_code', '=', self.state_code)], limit=1)
-            self.nationality_id = country if country else False
+            country_id = self.env['res.country']._get_state_code_map().get(self.state_code)
+            self.nationality_id = country_id or False
         else:
             self.nationality_id = False
 
     @api.model
-    def create(self, vals):
-        res = super(Registration, self).create(vals)
-
-        # Generate patient code
-        if res.code == 'new':
-            sequence = self.env['ir.sequence'].next_by_code('registration_seq')
-            if sequence:
-                res.code = sequence
+    def _next_registration_codes(self, count):
+        """Reserve ``count`` codes of ``registration_seq`` in a single round-trip."""
+        if count <= 0:
+            return []
+        IrSequence = self.env['ir.sequence']
+        IrSequence.check_access_rights('read')
+        sequence = IrSequence.sudo().search([
+            ('code', '=', 'registration_seq'),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            return [False] * count
+        if sequence.implementation != 'standard' or sequence.use_date_range:
+            return [sequence._next() for _ in range(count)]
+        self.env.cr.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            ['ir_sequence_%03d' % sequence.id, count],
+        )
+        return [sequence.get_next_char(number) for number, in self.env.cr.fetchall()]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        # Generate patient codes
+        pending = [vals for vals in vals_list if vals.get('code', 'new') == 'new']
+        for vals, code in zip(pending, self._next_registration_codes(len(pending))):
+            if code:
+                vals['code'] = code
+
+        records = super(Registration, self).create(vals_list)
+        self._refresh_employee_agents(set(records.mapped('name')))
 
         # Create my.cases record automatically
-        if vals.get('is_patient'):
-            self.env['my.cases'].create({
-                'patient_id': res.id,
-                'doctor': res.doctor.id,
-            })
+        cases_vals_list = [{
+            'patient_id': res.id,
+            'doctor': res.doctor.id,
+        } for res, vals in zip(records, vals_list) if vals.get('is_patient')]
+        if cases_vals_list:
+            self.env['my.cases'].create(cases_vals_list)
 
         # if vals.get('is_patient'):
         #     self.env['patient.appointment'].create({
@@ -188,55 +182,85 @@ class Registration(models.Model):
         #         'is_reserved': 'true',
         #     })
 
-        return res
+        return records
 
     def write(self, vals):
-        for rec in self:
-            old_doctor = rec.doctor
-            res = super(Registration, rec).write(vals)
-            new_doctor = rec.doctor
-
-            # إذا تم تغيير الدكتور فعليًا وكان المريض
-            if rec.is_patient and 'doctor' in vals and old_doctor != new_doctor:
-                # 1. سجل جديد في my.cases
-                self.env['my.cases'].create({
-                    'patient_id': rec.id,
-                    'doctor': new_doctor.id
-                })
-
-                # 2. إنشاء موعد جديد بناءً على آخر موعد
-                # last_appointment = self.env['patient.appointment'].search(
-                #     [('patient_id', '=', rec.id)],
-                #     order='appointment_date desc',
-                #     limit=1
-                # )
-                # if last_appointment:
-                #     appointment_vals = last_appointment.copy_data()[0]
-                #     appointment_vals.update({
-                #         'doctors_id': new_doctor.id,
-                #         'appointment_date': fields.Datetime.now(),
-                #         'appointment_type': 'checkup',
-                #         'is_reserved': True,
-                #     })
-                #     self.env['patient.appointment'].create(appointment_vals)
-
-                # 3. إنشاء فاتورة جديدة بناءً على آخر فاتورة
-                last_invoice = self.env['account.move'].search([
-                    ('partner_id', '=', rec.id),
-                    ('move_type', '=', 'out_invoice'),
-                    ('state', '!=', 'cancel')
-                ], order='invoice_date desc', limit=1)
-                if last_invoice:
-                    invoice_vals = last_invoice.copy_data()[0]
-                    invoice_vals.update({
-                        'doctor': new_doctor.id,
-                        'invoice_date': fields.Date.today(),
-                        'start_date': fields.Date.today(),
-                    })
-                    self.env['account.move'].create(invoice_vals)
-
+        # تغيير الاسم أو علامة الوكيل ممكن يغير ربط الموظفين بالوكلاء (بالاسم القديم والجديد)
+        agent_names = set(self.mapped('name')) if 'name' in vals or 'agent' in vals else set()
+        if 'doctor' not in vals:
+            res = super(Registration, self).write(vals)
+            if agent_names:
+                self._refresh_employee_agents(agent_names | set(self.mapped('name')))
+            return res
+
+        old_doctors = {rec.id: rec.doctor for rec in self}
+        res = super(Registration, self).write(vals)
+        if agent_names:
+            self._refresh_employee_agents(agent_names | set(self.mapped('name')))
+
+        # إذا تم تغيير الدكتور فعليًا وكان المريض
+        changed = self.filtered(lambda rec: rec.is_patient and rec.doctor != old_doctors[rec.id])
+        if changed:
+            changed._reassign_doctor_records()
         return res
 
+    def _get_last_invoice_ids(self):
+        """Return {partner_id: last out_invoice id} for the partners in self, in one query."""
+        if not self:
+            return {}
+        self.env['account.move'].flush_model(['partner_id', 'move_type', 'state', 'invoice_date'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (partner_id) partner_id, id
+              FROM account_move
+             WHERE partner_id IN %s
+               AND move_type = 'out_invoice'
+               AND state != 'cancel'
+          ORDER BY partner_id, invoice_date DESC NULLS LAST, id DESC
+        """, [tuple(self.ids)])
+        return dict(self.env.cr.fetchall())
+
+    def _reassign_doctor_records(self):
+        """Create the follow-up case and invoice of every patient in self for its new doctor."""
+        # 1. سجل جديد في my.cases
+        self.env['my.cases'].create([{
+            'patient_id': rec.id,
+            'doctor': rec.doctor.id,
+        } for rec in self])
+
+        # 2. إنشاء موعد جديد بناءً على آخر موعد
+        # last_appointment = self.env['patient.appointment'].search(
+        #     [('patient_id', '=', rec.id)],
+        #     order='appointment_date desc',
+        #     limit=1
+        # )
+        # if last_appointment:
+        #     appointment_vals = last_appointment.copy_data()[0]
+        #     appointment_vals.update({
+        #         'doctors_id': new_doctor.id,
+        #         'appointment_date': fields.Datetime.now(),
+        #         'appointment_type': 'checkup',
+        #         'is_reserved': True,
+        #     })
+        #     self.env['patient.appointment'].create(appointment_vals)
+
+        # 3. إنشاء فاتورة جديدة بناءً على آخر فاتورة
+        last_invoice_ids = self._get_last_invoice_ids()
+        if not last_invoice_ids:
+            return
+        last_invoices = self.env['account.move'].browse(list(last_invoice_ids.values()))
+        doctor_by_partner = {rec.id: rec.doctor.id for rec in self}
+        today = fields.Date.today()
+        invoice_vals_list = []
+        for invoice in last_invoices:
+            invoice_vals = invoice.copy_data()[0]
+            invoice_vals.update({
+                'doctor': doctor_by_partner[invoice.partner_id.id],
+                'invoice_date': today,
+                'start_date': today,
+            })
+            invoice_vals_list.append(invoice_vals)
+        self.env['account.move'].create(invoice_vals_list)
+
     @api.depends('birth_date')
     def _compute_age(self):
         for rec in self:
@@ -248,6 +272,90 @@ class Registration(models.Model):
             else:
                 rec.age = 0
 
+    @api.depends('birth_date')
+    def _compute_current_age(self):
+        today = date.today()
+        for rec in self:
+            if rec.birth_date:
+                rec.current_age = today.year - rec.birth_date.year - (
+                        (today.month, today.day) < (rec.birth_date.month, rec.birth_date.day)
+                )
+            else:
+                rec.current_age = 0
+
+    def _search_current_age(self, operator, value):
+        # العمر يتحول لنطاق على تاريخ الميلاد عشان البحث يتم في SQL
+        today = date.today()
+        value = int(value)
+
+        def at_least(years):
+            return [('birth_date', '<=', today - relativedelta(years=years))]
+
+        def at_most(years):
+            return [('birth_date', '>', today - relativedelta(years=years + 1))]
+
+        if operator == '>=':
+            return at_least(value)
+        if operator == '>':
+            return at_least(value + 1)
+        if operator == '<=':
+            return at_most(value)
+        if operator == '<':
+            return at_most(value - 1)
+        if operator == '=':
+            return expression.AND([at_least(value), at_most(value)])
+        if operator == '!=':
+            return expression.OR([at_least(value + 1), at_most(value - 1)])
+        raise ValidationError(f"عملية البحث '{operator}' غير مدعومة على العمر.")
+
+    def init(self):
+        super().init()
+        create_index(
+            self._cr, 'res_partner_patient_birthday_index', self._table, [BIRTHDAY_KEY_SQL],
+            where='is_patient AND birth_date IS NOT NULL',
+        )
+        # فهارس البحث السريع في الاستقبال
+        create_index(self._cr, 'res_partner_patient_code_index', self._table,
+                     ['code text_pattern_ops'], where='is_patient')
+        create_index(self._cr, 'res_partner_patient_mobile_index', self._table,
+                     [f'{MOBILE_DIGITS_SQL} text_pattern_ops'], where='is_patient')
+        create_index(self._cr, 'res_partner_patient_identity_index', self._table,
+                     ['identity_info text_pattern_ops'], where='is_patient')
+        if self.env.registry.has_trigram:
+            create_index(self._cr, 'res_partner_patient_name_trgm_index', self._table,
+                         ['name gin_trgm_ops'], method='gin', where='is_patient')
+
+    @api.model
+    def _cron_refresh_patient_age(self):
+        """Recompute the stored age of the patients whose birthday passed since the last run."""
+        params = self.env['ir.config_parameter'].sudo()
+        today = date.today()
+        last_run = fields.Date.to_date(params.get_param('physiotherapy.age_refresh_date'))
+        days = min((today - last_run).days, 366) if last_run else 1
+
+        birthday_keys = set()
+        for offset in range(days):
+            day = today - timedelta(days=offset)
+            birthday_keys.add(day.month * 100 + day.day)
+            # مواليد 29 فبراير يكبروا يوم 1 مارس في السنة غير الكبيسة
+            if (day.month, day.day) == (3, 1) and not calendar.isleap(day.year):
+                birthday_keys.add(229)
+
+        if birthday_keys:
+            self.flush_model(['is_patient', 'birth_date'])
+            self.env.cr.execute(f"""
+                SELECT id
+                  FROM res_partner
+                 WHERE is_patient AND birth_date IS NOT NULL
+                   AND {BIRTHDAY_KEY_SQL} = ANY(%s)
+            """, [list(birthday_keys)])
+            patients = self.browse([row[0] for row in self.env.cr.fetchall()])
+            if patients:
+                self.env.add_to_compute(self._fields['age'], patients)
+                patients._recompute_recordset(['age'])
+
+        params.set_param('physiotherapy.age_refresh_date', fields.Date.to_string(today))
+
     @api.onchange('birth_date')
     def _onchange_birth_date(self):
         if self.birth_date:
@@ -259,27 +367,94 @@ class Registration(models.Model):
             self.age = 0
 
     @api.model
-    def search_fetch(self, domain, field_names, offset=0, limit=None, order=None):
+    @tools.ormcache('self.env.uid')
+    def _get_patient_scope_domain(self):
+        """Return the extra search domain of the current user, cached per user."""
         user = self.env.user
 
         # If user is reception staff, they can see all patients but limited fields
         if user.has_group('physiotherapy.module_contact_access'):
             # Reception staff can see all patients
-            pass
-        elif user.has_group('physiotherapy.group_contact_recption'):
+            return ()
+        if user.has_group('physiotherapy.group_contact_recption'):
             # Doctors can only see their own patients
-            domain = expression.AND([
-                domain,
-                ['|',
-                 ('is_patient', '=', False),  # عرض كل السجلات التي ليست مرضى
-                 '&',
-                 ('is_patient', '=', True),  # لكن إذا كانت مريض
-                 ('doctor.user_id', '=', user.id)  # يشترط أن يكون الطبيب المستخدم الحالي
-                 ]
-            ])
+            return (
+                '|',
+                ('is_patient', '=', False),  # عرض كل السجلات التي ليست مرضى
+                ('doctor_user_id', '=', user.id),  # أو مريض الطبيب المستخدم الحالي
+            )
+        return ()
+
+    @api.model
+    def search_fetch(self, domain, field_names, offset=0, limit=None, order=None):
+        scope_domain = self._get_patient_scope_domain()
+        if scope_domain:
+            domain = expression.AND([domain, list(scope_domain)])
 
         return super(Registration, self).search_fetch(domain, field_names, offset=offset, limit=limit, order=order)
 
+    @api.model
+    def reception_patient_lookup(self, term, limit=20):
+        """Find patients by code, mobile or identity prefix, or by part of the name.
+
+        Returns a minimal projection (id, code, name, mobile, doctor) straight
+        from SQL, using the partial indexes created in ``init``.
+        """
+        term = (term or '').strip()
+        if not term:
+            return []
+        self.check_access_rights('read')
+        self.flush_model(['is_patient', 'active', 'company_id', 'code', 'name', 'mobile',
+                          'identity_info', 'doctor', 'doctor_user_id'])
+
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        digits = ''.join(char for char in term if char.isdigit())
+        params = {
+            'term': term,
+            'prefix': f'{escaped}%',
+            'contains': f'%{escaped}%',
+            'digits': f'{digits}%',
+            'company_ids': self.env.companies.ids,
+            'uid': self.env.uid,
+            'limit': min(int(limit), 50),
+        }
+        conditions = [
+            'p.code LIKE %(prefix)s',
+            'p.identity_info LIKE %(prefix)s',
+            'p.name ILIKE %(contains)s',
+        ]
+        if digits:
+            conditions.append(f'{MOBILE_DIGITS_SQL.replace("mobile", "p.mobile")} LIKE %(digits)s')
+        # نفس قيود search_fetch: الدكتور يشوف مرضاه بس
+        scope = 'AND p.doctor_user_id = %(uid)s' if self._get_patient_scope_domain() else ''
+
+        self.env.cr.execute(f"""
+            SELECT p.id, p.code, p.name, p.mobile, e.name AS doctor
+              FROM res_partner p
+         LEFT JOIN hr_employee e ON e.id = p.doctor
+             WHERE p.is_patient
+               AND p.active
+               AND (p.company_id IS NULL OR p.company_id = ANY(%(company_ids)s))
+               AND ({' OR '.join(conditions)})
+               {scope}
+          ORDER BY p.code = %(term)s DESC, p.name
+             LIMIT %(limit)s
+        """, params)
+        return self.env.cr.dictfetchall()
+
+    def action_view_assessments(self):
+        return {
+            'name': 'التقييمات',
+            'type': 'ir.actions.act_window',
+            'res_model': 'patient.assessment',
+            'view_mode': 'tree,form',
+            'domain': [('patient_id', '=', self.id)],
+            'context': {
+                'default_patient_id': self.id,
+                'default_doctor': self.doctor.id if self.doctor else False,
+            }
+        }
+
     def appointment(self):
         return {
             'name': 'Doctor Appointment',
@@ -297,14 +472,34 @@ class Registration(models.Model):
 class CountryInherit(models.Model):
     _inherit = 'res.country'
 
-    state_code = fields.Char(string="كود الدولة", copy=False)
+    name = fields.Char(index='trigram')
+    state_code = fields.Char(string="كود الدولة", copy=False, index='trigram')
+
+    @tools.ormcache()
+    def _get_state_code_map(self):
+        """Return {state_code: country id}, cached until a country is changed."""
+        self.flush_model(['state_code'])
+        self.env.cr.execute("SELECT state_code, id FROM res_country WHERE state_code IS NOT NULL ORDER BY id DESC")
+        return dict(self.env.cr.fetchall())
 
-    def name_get(self):
-        result = []
+    @tools.ormcache('self.env.lang')
+    def _get_display_name_map(self):
+        """Return {country id: "name [state_code]"} in the current language."""
+        countries = self.sudo().search([])
+        return {
+            country.id: f"{country.name} [{country.state_code}]" if country.state_code else country.name
+            for country in countries
+        }
+
+    @api.depends('name', 'state_code')
+    @api.depends_context('lang')
+    def _compute_display_name(self):
+        display_names = self._get_display_name_map()
         for record in self:
-            name = f"{record.name} [{record.state_code}]" if record.state_code else record.name
-            result.append((record.id, name))
-        return result
+            if isinstance(record.id, int) and record.id in display_names:
+                record.display_name = display_names[record.id]
+            else:
+                record.display_name = f"{record.name} [{record.state_code}]" if record.state_code else record.name
 
     @api.model
     def create_unknown_country(self):
@@ -319,21 +514,62 @@ class CountryInherit(models.Model):
     def init(self):
         """Run automatically when module is installed/updated."""
         self.create_unknown_country()
+        self.assign_missing_state_codes()
+        self._cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS res_country_state_code_uniq
+                ON res_country (state_code)
+             WHERE state_code IS NOT NULL AND state_code NOT IN ('', 'new')
+        """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(CountryInherit, self).create(vals_list)
+        self.env.registry.clear_cache()
+        return records
 
-    @api.model
-    def create(self, vals):
-        return super(CountryInherit, self).create(vals)
+    def write(self, vals):
+        res = super(CountryInherit, self).write(vals)
+        if 'name' in vals or 'state_code' in vals:
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super(CountryInherit, self).unlink()
+        self.env.registry.clear_cache()
+        return res
 
     @api.model
     def assign_missing_state_codes(self):
+        self.flush_model(['state_code'])
+        self._cr.execute("SELECT id, state_code FROM res_country ORDER BY id")
+
+        # الأكواد المستخدمة تتجمع مرة واحدة، والمكرر بياخد كود جديد
+        used_codes = set()
+        missing_ids = []
+        for country_id, state_code in self._cr.fetchall():
+            if not state_code or state_code == 'new' or state_code in used_codes:
+                missing_ids.append(country_id)
+            else:
+                used_codes.add(state_code)
+        if not missing_ids:
+            return
+
         code = 101
-        countries = self.search([], order='id')
-        for country in countries:
-            if not country.state_code or country.state_code == 'new':
-                while str(code) in countries.mapped('state_code'):
-                    code += 1
-                country.state_code = str(code)
+        new_codes = []
+        for _country_id in missing_ids:
+            while str(code) in used_codes:
                 code += 1
+            new_codes.append(str(code))
+            code += 1
+
+        self._cr.execute("""
+            UPDATE res_country AS country
+               SET state_code = new.state_code
+              FROM (SELECT unnest(%s::int[]) AS id, unnest(%s::varchar[]) AS state_code) AS new
+             WHERE country.id = new.id
+        """, [missing_ids, new_codes])
+        self.invalidate_model(['state_code'])
+        self.env.registry.clear_cache()
 
     @api.model
     def name_search(self, name='', args=None, operator='ilike', limit=100):
@@ -342,4 +578,6 @@ class CountryInherit(models.Model):
 
         if name:
             domain = ['|', ('name', operator, name), ('state_code', operator, name)] + domain
-        return self.search(domain, limit=limit).name_get()
+        display_names = self._get_display_name_map()
+        return [(country.id, display_names.get(country.id) or country.display_name)
+                for country in self.search(domain, limit=limit)]
@@ -0,0 +1,104 @@
+from dateutil.relativedelta import relativedelta
+
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+
+
+class SubscriptionSchedule(models.Model):
+    _name = 'subscription.schedule'
+    _description = 'Subscription Schedule'
+    _order = 'due_date, id'
+    _rec_name = 'template_id'
+
+    template_id = fields.Many2one('account.move', string="فاتورة الاشتراك", required=True, index=True,
+                                  ondelete='cascade')
+    partner_id = fields.Many2one('res.partner', string="المريض", required=True, index=True)
+    month_index = fields.Integer(string="رقم الشهر", required=True)
+    due_date = fields.Date(string="تاريخ الاستحقاق", required=True)
+    amount = fields.Float(string="المبلغ")
+    state = fields.Selection([
+        ('planned', 'مخطط'),
+        ('invoiced', 'تمت الفوترة'),
+        ('skipped', 'فاتورة موجودة'),
+    ], string="الحالة", default='planned', required=True)
+    invoice_id = fields.Many2one('account.move', string="الفاتورة", ondelete='set null')
+
+    _sql_constraints = [
+        ('template_month_uniq', 'unique(template_id, month_index)', "هذا الشهر مخطط بالفعل لهذا الاشتراك."),
+    ]
+
+    def init(self):
+        create_index(self._cr, 'subscription_schedule_due_date_state_index', self._table, ['due_date', 'state'])
+
+    @api.model
+    def _plan_pending_templates(self, partner_id_from=None, partner_id_to=None):
+        """Create the missing schedule rows of the subscriptions that are not complete yet."""
+        AccountMove = self.env['account.move']
+        templates = AccountMove._get_pending_subscription_templates(partner_id_from, partner_id_to)
+        locked_partners = AccountMove._lock_subscription_partners(templates.partner_id.ids)
+        templates = templates.filtered(lambda template: template.partner_id.id in locked_partners)
+        if not templates:
+            return
+
+        self.flush_model(['template_id', 'month_index'])
+        self.env.cr.execute(
+            "SELECT template_id, month_index FROM subscription_schedule WHERE template_id IN %s",
+            [tuple(templates.ids)],
+        )
+        planned = set(self.env.cr.fetchall())
+
+        vals_list = []
+        for template in templates:
+            amount = sum(line.quantity * line.price_unit for line in template.invoice_line_ids)
+            for month_index in range(1, template.months):
+                if (template.id, month_index) in planned:
+                    continue
+                vals_list.append({
+                    'template_id': template.id,
+                    'partner_id': template.partner_id.id,
+                    'month_index': month_index,
+                    'due_date': template.start_date + relativedelta(months=month_index),
+                    'amount': amount,
+                })
+        if vals_list:
+            self.create(vals_list)
+        templates._mark_subscription_complete()
+
+    @api.model
+    def _mark_invoiced(self, row_ids, invoice_ids):
+        """Link the rows ``row_ids`` to ``invoice_ids`` (same order) in one UPDATE."""
+        if not row_ids:
+            return
+        self.flush_model(['state', 'invoice_id'])
+        self.env.cr.execute("""
+            UPDATE subscription_schedule AS schedule
+               SET state = 'invoiced',
+                   invoice_id = new.invoice_id,
+                   write_uid = %s,
+                   write_date = now() AT TIME ZONE 'UTC'
+              FROM (SELECT unnest(%s::int[]) AS id, unnest(%s::int[]) AS invoice_id) AS new
+             WHERE schedule.id = new.id
+        """, [self.env.uid, row_ids, invoice_ids])
+        self.browse(row_ids).invalidate_recordset(['state', 'invoice_id', 'write_uid', 'write_date'])
+
+    @api.model
+    def _get_due_rows(self, until=None, partner_id_from=None, partner_id_to=None):
+        """Return the planned rows due on or before ``until`` (all planned rows if not given)."""
+        domain = [('state', '=', 'planned')]
+        if until:
+            domain.append(('due_date', '<=', until))
+        if partner_id_from:
+            domain.append(('partner_id', '>=', partner_id_from))
+        if partner_id_to:
+            domain.append(('partner_id', '<=', partner_id_to))
+        return self.search(domain, order='due_date, id')
+
+    @api.model
+    def _filter_planned(self, row_ids):
+        """Re-read from the database which of ``row_ids`` are still planned."""
+        self.flush_model(['state'])
+        self.env.cr.execute(
+            "SELECT id FROM subscription_schedule WHERE id IN %s AND state = 'planned' ORDER BY due_date, id",
+            [tuple(row_ids)],
+        )
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
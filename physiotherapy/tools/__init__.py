@@ -0,0 +1 @@
+from .instrumentation import instrumented, log_summary, prometheus_text, track
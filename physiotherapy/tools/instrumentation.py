@@ -0,0 +1,105 @@
+"""In-process timing and query counters for the slow paths of the clinic modules.
+
+Every named operation aggregates its call count, wall time, SQL query count
+and processed rows. The numbers are kept per worker process; they are exposed
+as Prometheus text on ``/physiotherapy/metrics`` and logged periodically.
+"""
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+_logger = logging.getLogger(__name__)
+
+# أقل مدة (بالثواني) بين كل ملخص والتاني في اللوج
+LOG_SUMMARY_INTERVAL = 300
+
+_lock = threading.Lock()
+_stats = {}
+_last_summary = time.monotonic()
+
+
+class OperationProbe:
+    """Handle yielded by :func:`track`; set ``rows`` to the number of processed records."""
+
+    __slots__ = ('rows',)
+
+    def __init__(self, rows=0):
+        self.rows = rows
+
+
+@contextmanager
+def track(env, name, rows=0):
+    """Measure the enclosed block as operation ``name`` on the cursor of ``env``."""
+    probe = OperationProbe(rows)
+    cr = env.cr
+    queries_before = cr.sql_log_count
+    started = time.perf_counter()
+    try:
+        yield probe
+    finally:
+        _record(name, time.perf_counter() - started, cr.sql_log_count - queries_before, probe.rows)
+
+
+def instrumented(name):
+    """Decorate a model method so its calls are tracked as ``name``; rows are ``len(self)``."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with track(self.env, name, rows=len(self)):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _record(name, duration, queries, rows):
+    global _last_summary
+    with _lock:
+        stat = _stats.setdefault(name, {'calls': 0, 'seconds': 0.0, 'queries': 0, 'rows': 0, 'max_seconds': 0.0})
+        stat['calls'] += 1
+        stat['seconds'] += duration
+        stat['queries'] += queries
+        stat['rows'] += rows
+        stat['max_seconds'] = max(stat['max_seconds'], duration)
+        now = time.monotonic()
+        if now - _last_summary < LOG_SUMMARY_INTERVAL:
+            return
+        _last_summary = now
+    log_summary()
+
+
+def snapshot():
+    """Return a copy of the aggregated counters, keyed by operation name."""
+    with _lock:
+        return {name: dict(stat) for name, stat in _stats.items()}
+
+
+def log_summary():
+    """Log one line per operation, slowest total first."""
+    stats = snapshot()
+    for name, stat in sorted(stats.items(), key=lambda item: item[1]['seconds'], reverse=True):
+        _logger.info(
+            "%s: %d calls, %.3fs total, %.3fs max, %d queries, %d rows",
+            name, stat['calls'], stat['seconds'], stat['max_seconds'], stat['queries'], stat['rows'],
+        )
+
+
+def prometheus_text():
+    """Render the counters in the Prometheus text exposition format."""
+    metrics = [
+        ('calls', 'counter', 'Number of calls'),
+        ('seconds', 'counter', 'Total wall time in seconds'),
+        ('max_seconds', 'gauge', 'Slowest call in seconds'),
+        ('queries', 'counter', 'Number of SQL queries'),
+        ('rows', 'counter', 'Number of processed rows'),
+    ]
+    stats = snapshot()
+    lines = []
+    for key, kind, help_text in metrics:
+        metric = f'physiotherapy_operation_{key}' + ('_total' if kind == 'counter' else '')
+        lines.append(f'# HELP {metric} {help_text}.')
+        lines.append(f'# TYPE {metric} {kind}')
+        for name in sorted(stats):
+            lines.append(f'{metric}{{operation="{name}"}} {stats[name][key]}')
+    return '\n'.join(lines) + '\n'